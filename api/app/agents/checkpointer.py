@@ -0,0 +1,71 @@
+from collections import OrderedDict
+from typing import Any, Dict, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata
+from langgraph.checkpoint.memory import MemorySaver
+
+
+class BoundedMemorySaver(MemorySaver):
+    """In-process checkpointer that keeps only what the next turn needs.
+
+    MemorySaver keeps every checkpoint of every thread forever. Here each
+    thread holds just its latest checkpoint and the channel blobs it points
+    at, and the least recently written threads are evicted past max_threads,
+    so memory is bounded by max_threads x one windowed state.
+
+    State is still per process: it is lost on restart and not shared between
+    workers. An evicted or unknown thread simply starts with an empty window.
+    """
+
+    def __init__(self, max_threads: int = 10_000):
+        super().__init__()
+        self.max_threads = max_threads
+        self._threads: "OrderedDict[str, None]" = OrderedDict()
+        # Blob keys referenced by the latest checkpoint of each (thread_id, checkpoint_ns)
+        self._live_blobs: Dict[Tuple[str, str], Set[Tuple[str, str, str, Any]]] = {}
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        self._prune(thread_id, checkpoint_ns, checkpoint)
+        self._threads[thread_id] = None
+        self._threads.move_to_end(thread_id)
+        while len(self._threads) > self.max_threads:
+            self._evict(next(iter(self._threads)))
+        return next_config
+
+    def _prune(self, thread_id: str, checkpoint_ns: str, checkpoint: Checkpoint) -> None:
+        # Drop the thread's older checkpoints, their pending writes and superseded blobs
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        for checkpoint_id in [c for c in checkpoints if c != checkpoint["id"]]:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        live = {
+            (thread_id, checkpoint_ns, channel, version)
+            for channel, version in checkpoint["channel_versions"].items()
+        }
+        for key in self._live_blobs.get((thread_id, checkpoint_ns), set()) - live:
+            self.blobs.pop(key, None)
+        self._live_blobs[(thread_id, checkpoint_ns)] = live
+
+    def _evict(self, thread_id: str) -> None:
+        del self._threads[thread_id]
+        for checkpoint_ns, checkpoints in self.storage.pop(thread_id, {}).items():
+            for checkpoint_id in checkpoints:
+                self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            for key in self._live_blobs.pop((thread_id, checkpoint_ns), set()):
+                self.blobs.pop(key, None)
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        self._threads.pop(thread_id, None)
+        for key in [k for k in self._live_blobs if k[0] == thread_id]:
+            del self._live_blobs[key]
@@ -1,32 +1,171 @@
+import asyncio
+import hashlib
+import json
+import logging
+from collections import OrderedDict
 from typing import Any, Dict, List, TypedDict
+import orjson
+import redis.asyncio as redis
+from redis.exceptions import RedisError
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_ollama import ChatOllama
 from ..config import settings
+from .checkpointer import BoundedMemorySaver
+from .semantic_cache import SemanticCache
 
 State = Dict[str, Any]
 
+logger = logging.getLogger(__name__)
+
+# Hot config values bound once at import
+OLLAMA_URL = settings.OLLAMA_BASE_URL
+OLLAMA_MODEL = settings.OLLAMA_MODEL
+CACHE_MAX_ENTRIES = settings.CACHE_MAX_ENTRIES
+REDIS_CACHE_TTL = settings.REDIS_CACHE_TTL
+HISTORY_WINDOW = settings.HISTORY_WINDOW
+
 system_prompt = (
     "You are a helpful, concise customer service assistant. "
     "Answer clearly. If you use a tool, summarize results back to the user."
 )
 
+# Shared by every request so the prompt always starts with an identical prefix
+SYSTEM_MSG = SystemMessage(content=system_prompt)
+
 # Create the Ollama-backed chat model
-llm = ChatOllama(base_url=settings.OLLAMA_BASE_URL, model=settings.OLLAMA_MODEL)
+llm = ChatOllama(
+    base_url=OLLAMA_URL,
+    model=OLLAMA_MODEL,
+    temperature=settings.OLLAMA_TEMPERATURE,
+    keep_alive=settings.OLLAMA_KEEP_ALIVE,
+    num_predict=settings.OLLAMA_NUM_PREDICT,
+    num_ctx=settings.OLLAMA_NUM_CTX,
+    top_p=settings.OLLAMA_TOP_P,
+    repeat_penalty=settings.OLLAMA_REPEAT_PENALTY,
+)
+
+# Exact-match reply cache; only safe when decoding is deterministic
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_cache_lock = asyncio.Lock()
+_cache_active = settings.CACHE_ENABLED and settings.OLLAMA_TEMPERATURE == 0
+
+# Shared L2 behind the in-process LRU so workers and replicas reuse each other's replies
+_redis = redis.from_url(settings.REDIS_URL) if _cache_active and settings.REDIS_URL else None
+
+# Embedding-based cache for paraphrased prompts
+semantic_cache = (
+    SemanticCache(
+        base_url=OLLAMA_URL,
+        model=settings.SEMANTIC_CACHE_MODEL,
+        threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+        max_entries=CACHE_MAX_ENTRIES,
+    )
+    if settings.SEMANTIC_CACHE_ENABLED
+    else None
+)
+
+
+def cache_key(messages: List) -> str:
+    payload = json.dumps(
+        {
+            "model": OLLAMA_MODEL,
+            "sys": system_prompt,
+            "msgs": [(m.type, m.content) for m in messages],
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def cache_get(key: str) -> str | None:
+    async with _cache_lock:
+        reply = _cache.get(key)
+        if reply is not None:
+            _cache.move_to_end(key)
+            return reply
+    if _redis is None:
+        return None
+    try:
+        raw = await _redis.get(f"llmcache:{key}")
+    except RedisError as e:
+        logger.warning("Redis cache read failed: %s", e)
+        return None
+    if raw is None:
+        return None
+    try:
+        reply = orjson.loads(raw)["reply"]
+    except (orjson.JSONDecodeError, KeyError, TypeError) as e:
+        # A corrupt or foreign value under our prefix is just a miss
+        logger.warning("Ignoring unreadable Redis cache entry %s: %s", key, e)
+        return None
+    await _cache_put_local(key, reply)
+    return reply
+
+
+async def _cache_put_local(key: str, reply: str) -> None:
+    async with _cache_lock:
+        _cache[key] = reply
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+async def cache_put(key: str, reply: str) -> None:
+    await _cache_put_local(key, reply)
+    if _redis is None:
+        return
+    try:
+        await _redis.set(f"llmcache:{key}", orjson.dumps({"reply": reply}), ex=REDIS_CACHE_TTL)
+    except RedisError as e:
+        logger.warning("Redis cache write failed: %s", e)
 
 
 async def node_llm(state: State) -> State:
-    messages: List = [SystemMessage(content=system_prompt)]
-    for m in state.get("history", []):
-        if m.get("user"):
-            messages.append(HumanMessage(content=m["user"]))
-        if m.get("assistant"):
-            messages.append(HumanMessage(content=m["assistant"]))
-    messages.append(HumanMessage(content=state["input"]))
+    # Only the last HISTORY_WINDOW turns are replayed so prompt length stays bounded
+    history = state.get("history", [])[-HISTORY_WINDOW:]
+    reply = await generate(history, state["input"])
+    turns = history + [{"user": state["input"], "assistant": reply}]
+    return {"output": reply, "history": turns[-HISTORY_WINDOW:]}
 
-    resp = await llm.ainvoke(messages)
-    return {"output": resp.content}
 
+def build_messages(history: List[Dict[str, str]], text: str) -> List:
+    messages: List = [SYSTEM_MSG]
+    append = messages.append
+    for m in history:
+        user = m.get("user")
+        if user:
+            append(HumanMessage(content=user))
+        assistant = m.get("assistant")
+        if assistant:
+            append(AIMessage(content=assistant))
+    append(HumanMessage(content=text))
+    return messages
+
+
+async def generate(history: List[Dict[str, str]], text: str) -> str:
+    messages = build_messages(history, text)
+
+    key = cache_key(messages) if _cache_active else None
+    if key:
+        cached = await cache_get(key)
+        if cached is not None:
+            return cached
+
+    vec = None
+    if semantic_cache is not None:
+        last_assistant = history[-1].get("assistant", "") if history else ""
+        vec = await semantic_cache.embed(f"{text}\n{last_assistant}")
+        cached = await semantic_cache.lookup(vec)
+        if cached is not None:
+            return cached
+
+    resp = await llm.ainvoke(messages)
+    if key:
+        await cache_put(key, resp.content)
+    if vec is not None:
+        await semantic_cache.add(vec, resp.content)
+    return resp.content
 
 
 class ChatState(TypedDict):
@@ -39,4 +178,7 @@ builder.add_node("llm", node_llm)
 builder.set_entry_point("llm")
 builder.add_edge("llm", END)
 
-app_graph = builder.compile()
+# Per-session state (history window) is kept by the checkpointer, keyed by thread_id.
+# It is in-process and bounded: evicted or restarted sessions start with an empty window,
+# while /history keeps serving the full transcript from Mongo.
+app_graph = builder.compile(checkpointer=BoundedMemorySaver(max_threads=settings.CHECKPOINT_MAX_THREADS))
@@ -0,0 +1,48 @@
+import asyncio
+from typing import List, Optional
+
+import numpy as np
+from langchain_ollama import OllamaEmbeddings
+
+
+class SemanticCache:
+    """Nearest-neighbour reply cache over L2-normalized prompt embeddings.
+
+    Vectors live in a flat matrix, so a lookup is a single inner-product scan
+    (cosine similarity); replies are kept in a parallel list.
+    """
+
+    def __init__(self, base_url: str, model: str, threshold: float = 0.92, max_entries: int = 1024):
+        self.embeddings = OllamaEmbeddings(base_url=base_url, model=model)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._vectors: Optional[np.ndarray] = None
+        self._replies: List[str] = []
+        self._lock = asyncio.Lock()
+
+    async def embed(self, text: str) -> np.ndarray:
+        vec = np.asarray(await self.embeddings.aembed_query(text), dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    async def lookup(self, vec: np.ndarray) -> Optional[str]:
+        async with self._lock:
+            if self._vectors is None:
+                return None
+            scores = self._vectors @ vec
+            best = int(np.argmax(scores))
+            if scores[best] >= self.threshold:
+                return self._replies[best]
+            return None
+
+    async def add(self, vec: np.ndarray, reply: str) -> None:
+        async with self._lock:
+            if self._vectors is None:
+                self._vectors = vec[np.newaxis, :]
+            else:
+                self._vectors = np.vstack([self._vectors, vec])
+            self._replies.append(reply)
+            if len(self._replies) > self.max_entries:
+                # Drop the oldest entry
+                self._vectors = self._vectors[1:]
+                self._replies.pop(0)
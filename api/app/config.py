@@ -14,15 +14,38 @@ class Settings(BaseSettings):
 
     OLLAMA_BASE_URL: str = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
     OLLAMA_MODEL: str = os.getenv("OLLAMA_MODEL", "llama3.1")
+    OLLAMA_TEMPERATURE: float = float(os.getenv("OLLAMA_TEMPERATURE", "0"))
+    OLLAMA_KEEP_ALIVE: str = os.getenv("OLLAMA_KEEP_ALIVE", "1h")
+    OLLAMA_NUM_PREDICT: int = int(os.getenv("OLLAMA_NUM_PREDICT", "256"))
+    OLLAMA_NUM_CTX: int = int(os.getenv("OLLAMA_NUM_CTX", "2048"))
+    OLLAMA_TOP_P: float = float(os.getenv("OLLAMA_TOP_P", "0.9"))
+    OLLAMA_REPEAT_PENALTY: float = float(os.getenv("OLLAMA_REPEAT_PENALTY", "1.1"))
+
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+    REDIS_URL: str = os.getenv("REDIS_URL", "")
+    REDIS_CACHE_TTL: int = int(os.getenv("REDIS_CACHE_TTL", "3600"))
+
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+    SEMANTIC_CACHE_MODEL: str = os.getenv("SEMANTIC_CACHE_MODEL", "nomic-embed-text")
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
 
     MONGODB_URI: str = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
     MONGODB_DB: str = os.getenv("MONGODB_DB", "csai")
     MONGODB_COLLECTION: str = os.getenv("MONGODB_COLLECTION", "messages")
+    MONGODB_MAX_POOL_SIZE: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+    MONGODB_MIN_POOL_SIZE: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", "5"))
+    MONGODB_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "30000"))
+    MONGODB_COMPRESSORS: str = os.getenv("MONGODB_COMPRESSORS", "zstd")
+    MONGODB_WRITE_CONCERN: str = os.getenv("MONGODB_WRITE_CONCERN", "1")
+    HISTORY_LIMIT: int = int(os.getenv("HISTORY_LIMIT", "200"))
+    HISTORY_WINDOW: int = int(os.getenv("HISTORY_WINDOW", "8"))
+    CHECKPOINT_MAX_THREADS: int = int(os.getenv("CHECKPOINT_MAX_THREADS", "10000"))
 
     KAFKA_TOPIC:str = os.getenv("KAFKA_TOPIC", "customer_conversation")
     KAFKA_BOOTSTRAP_SERVERS:str = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
     KAFKA_GROUP_ID:str = os.getenv("KAFKA_GROUP_ID", "customer_conversation_consumer")
-    KAFKA_MAX_MESSAGE_SIZE:int = int(os.getenv("KAFKA_MAX_MESSAGE_SIZE"))
+    KAFKA_MAX_MESSAGE_SIZE:int = 1_048_576
 
     class Config:
         env_file = ".env"
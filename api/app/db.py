@@ -6,9 +6,28 @@ _client: AsyncIOMotorClient | None = None
 def get_client() -> AsyncIOMotorClient:
     global _client
     if _client is None:
-        _client = AsyncIOMotorClient(settings.MONGODB_URI)
+        w = settings.MONGODB_WRITE_CONCERN
+        _client = AsyncIOMotorClient(
+            settings.MONGODB_URI,
+            maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+            compressors=settings.MONGODB_COMPRESSORS,
+            w=int(w) if w.isdigit() else w,
+            retryWrites=True,
+        )
     return _client
 
+def close_client() -> None:
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
 def get_collection():
     client = get_client()
-    return client[settings.MONGODB_DB][settings.MONGODB_COLLECTION]
\ No newline at end of file
+    return client[settings.MONGODB_DB][settings.MONGODB_COLLECTION]
+
+async def ensure_indexes():
+    # Backs the session_id filter and _id sort used by /history
+    await get_collection().create_index([("session_id", 1), ("_id", 1)], background=True)
\ No newline at end of file
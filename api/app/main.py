@@ -1,21 +1,41 @@
 import asyncio
 import hashlib
 import json
+import logging
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from .config import settings
 from .schemas import ChatRequest, ChatResponse, HistoryResponse, HealthResponse
-from .db import get_collection
+from .db import close_client, ensure_indexes, get_client, get_collection
 from .agents.graph import app_graph
 from aiokafka import AIOKafkaConsumer
+from aiokafka.errors import KafkaError
+
+logger = logging.getLogger(__name__)
 
 consumer: AIOKafkaConsumer | None = None
 
+# Hot config values bound once at import
+OLLAMA_MODEL = settings.OLLAMA_MODEL
+HISTORY_LIMIT = settings.HISTORY_LIMIT
+
+# Raw payloads above this size are decoded off the event loop
+LARGE_PAYLOAD_BYTES = 64 * 1024
+
 def hash_message(msg: str) -> str:
-    return hashlib.md5(msg.encode("utf-8")).hexdigest()
+    return hashlib.sha256(msg.encode("utf-8")).hexdigest()
+
+async def decode_payload(raw: bytes) -> str:
+    if len(raw) > LARGE_PAYLOAD_BYTES:
+        return await asyncio.get_running_loop().run_in_executor(None, raw.decode, "utf-8")
+    return raw.decode("utf-8")
+
+async def handle_message(raw: bytes):
+    return await create_conversation(await decode_payload(raw))
 
 async def consume():
     global consumer
@@ -23,18 +43,35 @@ async def consume():
         settings.KAFKA_TOPIC,
         bootstrap_servers=settings.KAFKA_BOOTSTRAP_SERVERS,
         group_id=settings.KAFKA_GROUP_ID,
-        enable_auto_commit=True,
+        enable_auto_commit=False,
         auto_offset_reset="latest",
         max_partition_fetch_bytes=settings.KAFKA_MAX_MESSAGE_SIZE,
     )
     await consumer.start()
     try:
-        async for msg in consumer:
+        while True:
+            batches = await consumer.getmany(timeout_ms=200, max_records=500)
+            if not batches:
+                continue
+            results = await asyncio.gather(
+                *(
+                    handle_message(msg.value)
+                    for msgs in batches.values()
+                    for msg in msgs
+                ),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error("Failed to process Kafka message: %s", result)
+            # Commit once the whole batch has been attempted. A crash before this point
+            # redelivers the batch, but messages whose handler failed are logged and skipped.
             try:
-                value = msg.value.decode("utf-8")
-                await create_conversation(value)
-            except Exception as e:
-                print(f"Failed to process Kafka message: {e}")
+                await consumer.commit()
+            except KafkaError as e:
+                # e.g. CommitFailedError after a rebalance; the uncommitted batch is
+                # redelivered to the partition's new owner, so keep consuming
+                logger.warning("Kafka offset commit failed: %s", e)
     except asyncio.CancelledError:
         # Graceful shutdown
         print("Consumer task cancelled")
@@ -49,6 +86,9 @@ async def create_conversation(data:str):
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    # Create the Mongo client once at startup so requests never race to build it
+    get_client()
+    await ensure_indexes()
     task = asyncio.create_task(consume())
     yield
     # shutdown
@@ -57,9 +97,10 @@ async def lifespan(app: FastAPI):
         await task
     except asyncio.CancelledError:
         pass
+    close_client()
 
 
-app = FastAPI(title=settings.PROJECT_NAME,lifespan=lifespan)
+app = FastAPI(title=settings.PROJECT_NAME,lifespan=lifespan,default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -70,36 +111,51 @@ app.add_middleware(
 )
 @app.get("/health", response_model=HealthResponse)
 async def health():
-    return {"status": "ok", "model": settings.OLLAMA_MODEL}
+    return {"status": "ok", "model": OLLAMA_MODEL}
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat(req: ChatRequest):
     coll = get_collection()
-    await coll.insert_one({
+    # Store the user turn while the model is generating the reply
+    user_write = asyncio.create_task(coll.insert_one({
         "session_id": req.session_id,
         "role": "user",
         "text": req.message,
-    })
+    }))
 
-    result = await app_graph.ainvoke({
-        "input": req.message,
-    })
+    try:
+        result = await app_graph.ainvoke(
+            {"input": req.message},
+            config={"configurable": {"thread_id": req.session_id}},
+        )
+    except BaseException:
+        # Never leave the user write orphaned; its own error must not mask the graph's
+        await asyncio.gather(user_write, return_exceptions=True)
+        raise
     reply = result["output"]
 
-    await coll.insert_one({
-        "session_id": req.session_id,
-        "role": "assistant",
-        "text": reply,
-    })
+    await asyncio.gather(
+        user_write,
+        coll.insert_one({
+            "session_id": req.session_id,
+            "role": "assistant",
+            "text": reply,
+        }),
+    )
 
     return {"session_id": req.session_id, "reply": reply}
 
 @app.get("/history/{session_id}", response_model=HistoryResponse)
 async def history(session_id: str):
     coll = get_collection()
-    cursor = coll.find({"session_id": session_id}).sort("_id", 1)
-    data = [
-        {"role": d.get("role"), "text": d.get("text")} async for d in cursor
-    ]
+    # Newest HISTORY_LIMIT turns, returned oldest first
+    cursor = (
+        coll.find({"session_id": session_id}, projection={"_id": 0, "role": 1, "text": 1})
+        .sort("_id", -1)
+        .limit(HISTORY_LIMIT)
+        .batch_size(HISTORY_LIMIT)
+    )
+    data = await cursor.to_list(length=HISTORY_LIMIT)
+    data.reverse()
     return {"session_id": session_id, "messages": data}
 
@@ -0,0 +1,71 @@
+"""
+Tests for the bounded in-process LangGraph checkpointer.
+"""
+
+import asyncio
+from typing import List, TypedDict
+
+import pytest
+
+pytest.importorskip("langgraph")
+
+from langgraph.graph import END, StateGraph
+
+from app.agents.checkpointer import BoundedMemorySaver
+
+
+class CounterState(TypedDict):
+    input: str
+    seen: List[str]
+
+
+def _graph(saver):
+    async def node(state):
+        return {"seen": state.get("seen", []) + [state["input"]]}
+
+    builder = StateGraph(CounterState)
+    builder.add_node("node", node)
+    builder.set_entry_point("node")
+    builder.add_edge("node", END)
+    return builder.compile(checkpointer=saver)
+
+
+async def _turn(app, thread_id, text):
+    return await app.ainvoke({"input": text}, config={"configurable": {"thread_id": thread_id}})
+
+
+def test_thread_state_survives_pruning():
+    """Only the latest checkpoint is kept, and it still carries the thread's state."""
+    saver = BoundedMemorySaver(max_threads=10)
+    app = _graph(saver)
+
+    async def run():
+        for text in ("a", "b", "c"):
+            result = await _turn(app, "t1", text)
+        return result
+
+    result = asyncio.run(run())
+
+    assert result["seen"] == ["a", "b", "c"]
+    assert len(saver.storage["t1"][""]) == 1
+    assert {key[:2] for key in saver.blobs} == {("t1", "")}
+    assert len(saver.blobs) == len(saver._live_blobs[("t1", "")])
+
+
+def test_least_recently_written_thread_is_evicted():
+    """Past max_threads the oldest thread is dropped and starts over with empty state."""
+    saver = BoundedMemorySaver(max_threads=2)
+    app = _graph(saver)
+
+    async def run():
+        await _turn(app, "t1", "a")
+        await _turn(app, "t2", "b")
+        await _turn(app, "t3", "c")
+        return await _turn(app, "t1", "d")
+
+    result = asyncio.run(run())
+
+    assert result["seen"] == ["d"]
+    assert set(saver.storage) == {"t3", "t1"}
+    assert {key[0] for key in saver.blobs} == {"t3", "t1"}
+    assert not any(key[0] == "t2" for key in saver.writes)
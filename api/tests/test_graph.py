@@ -0,0 +1,45 @@
+"""
+Smoke tests for the chat graph module.
+Importing it builds the LangGraph graph, so a missing node fails here instead of at startup.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+pytest.importorskip("langgraph")
+pytest.importorskip("langchain_ollama")
+pytest.importorskip("redis")
+
+from app.agents import graph
+
+
+def test_graph_module_imports():
+    """The module imports and compiles a graph with the llm node."""
+    assert callable(graph.node_llm)
+    assert graph.app_graph is not None
+
+
+def test_node_llm_keeps_bounded_history():
+    """node_llm replays the last HISTORY_WINDOW turns and appends the new one."""
+    window = graph.HISTORY_WINDOW
+    history = [{"user": f"q{i}", "assistant": f"a{i}"} for i in range(window + 2)]
+
+    with patch.object(graph, "generate", AsyncMock(return_value="reply")) as generate:
+        result = asyncio.run(graph.node_llm({"input": "hello", "history": history}))
+
+    generate.assert_awaited_once_with(history[-window:], "hello")
+    assert result["output"] == "reply"
+    assert len(result["history"]) == window
+    assert result["history"][-1] == {"user": "hello", "assistant": "reply"}
+
+
+@pytest.mark.parametrize("raw", [b"not json", b'{"other": 1}', b"[1, 2]"])
+def test_cache_get_treats_unreadable_redis_value_as_miss(raw):
+    """A corrupt or foreign value under llmcache:* is a cache miss, not an error."""
+    redis_client = AsyncMock()
+    redis_client.get = AsyncMock(return_value=raw)
+
+    with patch.object(graph, "_redis", redis_client):
+        assert asyncio.run(graph.cache_get("missing-key")) is None
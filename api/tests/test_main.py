@@ -0,0 +1,78 @@
+"""
+Tests for the chat endpoint's write handling.
+"""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("aiokafka")
+pytest.importorskip("langgraph")
+
+from app import main
+from app.schemas import ChatRequest
+
+
+def _collection(insert_one):
+    coll = MagicMock()
+    coll.insert_one = insert_one
+    return coll
+
+
+def test_chat_stores_both_turns():
+    """The user and assistant turns are both written on success."""
+    insert_one = AsyncMock()
+    graph = MagicMock()
+    graph.ainvoke = AsyncMock(return_value={"output": "hi there"})
+
+    with patch.object(main, "get_collection", return_value=_collection(insert_one)), \
+            patch.object(main, "app_graph", graph):
+        response = asyncio.run(main.chat(ChatRequest(session_id="s1", message="hello")))
+
+    assert response == {"session_id": "s1", "reply": "hi there"}
+    roles = [call_args[0][0]["role"] for call_args in insert_one.await_args_list]
+    assert roles == ["user", "assistant"]
+
+
+def test_chat_awaits_user_write_when_graph_fails():
+    """A failing graph still waits for the user write and re-raises its own error."""
+    write_finished = False
+
+    async def slow_insert(doc):
+        nonlocal write_finished
+        await asyncio.sleep(0.01)
+        write_finished = True
+        raise RuntimeError("write failed")
+
+    graph = MagicMock()
+    graph.ainvoke = AsyncMock(side_effect=ValueError("graph failed"))
+
+    with patch.object(main, "get_collection", return_value=_collection(slow_insert)), \
+            patch.object(main, "app_graph", graph):
+        with pytest.raises(ValueError, match="graph failed"):
+            asyncio.run(main.chat(ChatRequest(session_id="s1", message="hello")))
+
+    assert write_finished
+
+
+def test_consume_survives_commit_failure():
+    """A failed offset commit is logged and the consumer keeps polling."""
+    from aiokafka.errors import CommitFailedError
+
+    message = MagicMock(value=b"payload")
+    consumer = MagicMock()
+    consumer.start = AsyncMock()
+    consumer.stop = AsyncMock()
+    consumer.getmany = AsyncMock(side_effect=[{"tp": [message]}, asyncio.CancelledError()])
+    consumer.commit = AsyncMock(side_effect=CommitFailedError("rebalanced"))
+
+    with patch.object(main, "AIOKafkaConsumer", return_value=consumer), \
+            patch.object(main, "create_conversation", AsyncMock()) as create:
+        asyncio.run(main.consume())
+
+    create.assert_awaited_once_with("payload")
+    consumer.commit.assert_awaited_once()
+    assert consumer.getmany.await_count == 2
+    consumer.stop.assert_awaited_once()
@@ -9,6 +9,7 @@ import os
 import json
 import asyncio
 import aiohttp
+import orjson
 from logger import logger
 from error_handler import error_response
 
@@ -17,6 +18,35 @@ from error_handler import error_response
 MAX_RETRIES = 3
 RETRY_DELAYS = [2, 4, 8]  # Exponential backoff: 2s, 4s, 8s
 
+# Used to pull a JSON object out of surrounding model prose
+_JSON_DECODER = json.JSONDecoder()
+
+# Shared HTTP session so calls reuse keep-alive connections to Ollama
+_session = None
+
+
+def _get_session():
+    """
+    Returns the shared aiohttp session, creating it on first use.
+    Must be called from within a running event loop.
+    """
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=60),
+            # Increased timeout to 300 seconds (5 minutes) to accommodate slower model responses
+            timeout=aiohttp.ClientTimeout(total=300)
+        )
+    return _session
+
+
+async def close_session():
+    """Closes the shared aiohttp session, if one is open."""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
 
 async def ollama_classify_async(messages):
     """
@@ -50,53 +80,54 @@ async def ollama_classify_async(messages):
             "stream": False
         }
         
-        logger.info(f"Sending messages to Ollama (async): {payload}")
+        logger.debug("Sending messages to Ollama (async): %s", payload)
         
-        # Use aiohttp for async HTTP requests
-        session = aiohttp.ClientSession()
-        try:
-            async with session:
-                # Increased timeout to 300 seconds (5 minutes) to accommodate slower model responses
-                response = await session.post(url, json=payload, timeout=300)
-                if response.status != 200:
-                    logger.error(f"LLM returned error status: {response.status}")
-                    return {"error": f"LLM error status: {response.status}"}
-                
-                data = await response.json()
-                logger.info(f"Raw LLM response (async): {data}")
-                
-                content = ""
-                if "message" in data:
-                    content = data["message"].get("content", "").strip()
-                elif "messages" in data and len(data["messages"]) > 0:
-                    content = data["messages"][0].get("content", "").strip()
-                
-                # Log the raw content from LLM for debugging
-                logger.info(f"Raw LLM content (before parsing): {content}")
-                
-                if not content:
-                    logger.error("Empty LLM response content")
-                    return error_response("Empty LLM response content")
-                
-                try:
-                    parsed = json.loads(content)
-                    logger.info(f"Extracted JSON object (async): {parsed}")
-                    return parsed
-                except Exception as e:
-                    logger.error(f"Failed to parse LLM response content as JSON: {e}")
-                    # Try to extract JSON substring
-                    start, end = content.find("{"), content.rfind("}")
-                    if start != -1 and end != -1:
-                        try:
-                            parsed = json.loads(content[start:end+1])
-                            logger.info(f"Extracted JSON substring (async): {parsed}")
-                            return parsed
-                        except Exception as e2:
-                            logger.error(f"Failed to parse JSON substring: {e2}")
-                    return error_response("Failed to parse LLM response as JSON")
-        finally:
-            if not session.closed:
-                await session.close()
+        session = _get_session()
+        # The context manager hands the connection back to the shared pool on every path
+        async with session.post(
+            url,
+            data=orjson.dumps(payload),
+            headers={"Content-Type": "application/json"}
+        ) as response:
+            if response.status != 200:
+                logger.error(f"LLM returned error status: {response.status}")
+                return {"error": f"LLM error status: {response.status}"}
+            
+            data = await response.json(loads=orjson.loads)
+        logger.debug("Raw LLM response (async): %s", data)
+        
+        content = ""
+        if "message" in data:
+            content = data["message"].get("content", "").strip()
+        elif "messages" in data and len(data["messages"]) > 0:
+            content = data["messages"][0].get("content", "").strip()
+        
+        # Log the raw content from LLM for debugging
+        logger.debug("Raw LLM content (before parsing): %s", content)
+        
+        if not content:
+            logger.error("Empty LLM response content")
+            return error_response("Empty LLM response content")
+        
+        # Bare JSON objects take the fast path; anything wrapped in prose is
+        # decoded in a single scan starting at the first brace
+        if content.startswith("{"):
+            try:
+                parsed = orjson.loads(content)
+                logger.debug("Extracted JSON object (async): %s", parsed)
+                return parsed
+            except orjson.JSONDecodeError as e:
+                logger.error(f"Failed to parse LLM response content as JSON: {e}")
+        
+        start = content.find("{")
+        if start != -1:
+            try:
+                parsed, _ = _JSON_DECODER.raw_decode(content, start)
+                logger.debug("Extracted JSON substring (async): %s", parsed)
+                return parsed
+            except ValueError as e:
+                logger.error(f"Failed to parse JSON substring: {e}")
+        return error_response("Failed to parse LLM response as JSON")
     
     except asyncio.TimeoutError:
         logger.error("LLM async request timed out")
@@ -109,39 +140,34 @@ async def ollama_classify_async(messages):
         return {"error": f"LLM error: {str(e)}"}
 
 
-async def safe_ollama_classify_async(messages, retries=None, delay_index=0):
+async def safe_ollama_classify_async(messages, retries=None):
     """
     Safely calls the ollama_classify_async function with retry logic.
-    Implements exponential backoff for transient failures.
+    Implements exponential backoff for transient network failures; any other
+    exception is treated as a bug and propagates immediately.
     
     Args:
         messages (list): List of message objects
-        retries (int, optional): Number of retries remaining. Defaults to MAX_RETRIES.
-        delay_index (int, optional): Index into RETRY_DELAYS for current retry. Defaults to 0.
+        retries (int, optional): Number of retries allowed. Defaults to MAX_RETRIES.
         
     Returns:
         dict: LLM response or error object after retries are exhausted
     """
     if retries is None:
         retries = MAX_RETRIES
-        
-    try:
-        return await ollama_classify_async(messages)
-    except Exception as e:
-        if retries > 0:
+    
+    last_error = None
+    for attempt in range(retries + 1):
+        try:
+            return await ollama_classify_async(messages)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            last_error = e
+            if attempt == retries:
+                break
             # Get the delay for this retry attempt
-            delay = RETRY_DELAYS[min(delay_index, len(RETRY_DELAYS) - 1)]
-            logger.warning(f"LLM call failed, retrying in {delay}s... ({retries} attempts left)")
-            
-            # Wait before retrying
+            delay = RETRY_DELAYS[min(attempt, len(RETRY_DELAYS) - 1)]
+            logger.warning(f"LLM call failed, retrying in {delay}s... ({retries - attempt} attempts left)")
             await asyncio.sleep(delay)
-            
-            # Recursive call with decremented retries
-            return await safe_ollama_classify_async(
-                messages,
-                retries - 1,
-                delay_index + 1
-            )
-        else:
-            logger.error(f"LLM call failed after all retries: {str(e)}")
-            return {"error": f"LLM error after {MAX_RETRIES} retries: {str(e)}"}
\ No newline at end of file
+    
+    logger.error(f"LLM call failed after all retries: {str(last_error)}")
+    return {"error": f"LLM error after {retries} retries: {str(last_error)}"}
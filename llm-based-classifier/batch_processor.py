@@ -10,33 +10,76 @@ This module:
 5. Provides crash recovery and progress tracking
 """
 import os
+import logging
 from dotenv import load_dotenv
 import asyncio
-import json
+import orjson
 from prompt_builder import build_prompt  # Import the existing prompt builder
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional, Tuple
+from bson import ObjectId
+from typing import List, Dict, Any, Optional, Set
 import time
-import uuid
+from collections import deque
+from dataclasses import dataclass
 from logger import logger
-from async_llm_wrapper import safe_ollama_classify_async
+from async_llm_wrapper import safe_ollama_classify_async, close_session
 from error_handler import error_response
-from mongo_client import MongoClient
+from mongo_client import MongoClient, UNPROCESSED_FILTER
+from pymongo.errors import BulkWriteError
 from utils.batch_file_manager import BatchFileManager
-from utils.retry_utils import async_retry, RetryError
+from utils.retry_utils import async_retry, retry_with_backoff, RetryError
+from utils.document_utils import normalize_document
 
 
 load_dotenv()
 
+# Only the fields normalize_document reads are fetched from the source collection
+CLASSIFICATION_PROJECTION = {
+    "tweets.text": 1,
+    "messages.content": 1,
+    "messages.text": 1,
+    "messages.sender": 1,
+    "text": 1,
+    "content": 1
+}
+
+
+@dataclass(slots=True)
+class DocumentCounts:
+    # Per-document tallies kept as slot attributes on the hot path; folded into
+    # the stats dict at batch boundaries.
+    processed: int = 0
+    successful: int = 0
+    failed: int = 0
+    retried: int = 0
+
+    def record(self, result: Dict[str, Any]) -> None:
+        self.processed += 1
+        if result["status"] == "success":
+            self.successful += 1
+        else:
+            self.failed += 1
+        if result["retried"]:
+            self.retried += 1
+
+    def fold_into(self, stats: Dict[str, Any]) -> None:
+        # Add the tallies to stats and reset them.
+        stats["documents_processed"] += self.processed
+        stats["successful"] += self.successful
+        stats["failed"] += self.failed
+        stats["retried"] += self.retried
+        self.processed = self.successful = self.failed = self.retried = 0
+
+
 class BatchProcessor:
     async def _store_classification(self, output_doc: Dict[str, Any]) -> bool:
         """Store the classified output document in the target collection."""
         try:
             await self.mongo_client.target_collection.insert_one(output_doc)
-            logger.info(f"Stored classified document with _id={output_doc.get('_id')}")
+            logger.debug("Stored classified document with _id=%s", output_doc.get('_id'))
             return True
         except Exception as e:
-            logger.error(f"Error storing classified document: {str(e)}")
+            logger.error("Error storing classified document: %s", e)
             return False
     async def process_retry_queue(self):
         """Stub for retry queue processing. Returns empty stats."""
@@ -59,7 +102,8 @@ class BatchProcessor:
                  checkpoint_interval: int = 50,
                  mode: str = "batch",
                  continuous_interval: int = 60,
-                 max_retries: int = 3):
+                 max_retries: int = 3,
+                 mongo_client: Optional[MongoClient] = None):
         """
         Initialize the batch processor.
         
@@ -75,6 +119,8 @@ class BatchProcessor:
             mode: Processing mode ("batch", "continuous", "scheduled")
             continuous_interval: Polling interval for continuous mode (seconds)
             max_retries: Maximum number of retries for failed operations
+            mongo_client: Already-connected client to reuse; connect() and close()
+                leave it to the caller (e.g. the CLI daemon)
         """
         # MongoDB configuration
         self.mongodb_uri = mongodb_uri or os.getenv("MONGODB_URI")
@@ -95,14 +141,44 @@ class BatchProcessor:
         self.continuous_interval = continuous_interval
         self.max_retries = max_retries
         
+        # Ollama only serves OLLAMA_NUM_PARALLEL requests per model at once; the rest queue server-side
+        num_parallel = os.getenv("OLLAMA_NUM_PARALLEL")
+        if num_parallel and num_parallel.isdigit() and int(num_parallel) < max_concurrent:
+            logger.warning(
+                f"OLLAMA_NUM_PARALLEL={num_parallel} is below max_concurrent={max_concurrent}; "
+                f"extra requests will wait in Ollama's queue"
+            )
+        
         # Initialize components
-        self.mongo_client = None
+        self.mongo_client = mongo_client
+        self._shared_client = mongo_client is not None
         self.batch_file_manager = BatchFileManager(batch_dir)
-        self.semaphore = asyncio.Semaphore(max_concurrent)
+        
+        # The system prompt and few-shot turns never change, so build them once;
+        # only the final user turn is filled in per document
+        template = build_prompt(conversation_number="__TEMPLATE__", aggregated_text="__BODY__")["messages"]
+        self._prompt_prefix = template[:-1]
+        self._user_prefix, self._user_suffix = template[-1]["content"].split("__BODY__")
+        
+        # Write buffers, flushed every batch_size documents by _end_batch
+        self._pending_inserts: List[Dict[str, Any]] = []
+        self._pending_updates: List[Dict[str, Any]] = []
         
         # State tracking
         self.job_id = f"job_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}"
         self.last_processed_id = None
+        # Ids in the order _producer queued them; last_processed_id only moves past an id
+        # once it and every id queued before it have been flushed, so out-of-order
+        # completions never let a checkpoint skip a document that is still in flight
+        self._dispatched: deque = deque()
+        self._flushed_ids: set = set()
+        self._since_checkpoint = 0  # documents folded into stats since the last checkpoint
+        self._started = None  # time.monotonic() at the start of run()
+        
+        # Checkpoints are written off the hot path by _checkpoint_writer
+        self._ckpt_queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._ckpt_task: Optional[asyncio.Task] = None
+        self._counts = DocumentCounts()
         self.stats = {
             "job_id": self.job_id,
             "start_time": None,
@@ -126,25 +202,36 @@ class BatchProcessor:
         # Connect to MongoDB and initialize collections.
         # Args:
         #     db_name: Name of the MongoDB database
+        if self._shared_client:
+            return True
         try:
             logger.info(f"[CONNECT] MongoDB URI: {self.mongodb_uri}")
             logger.info(f"[CONNECT] DB Name: {db_name or self.db_name}")
             logger.info(f"[CONNECT] Source Collection: {self.source_collection_name}")
             logger.info(f"[CONNECT] Target Collection: {self.target_collection_name}")
+            # A second run() on the same processor replaces the client; release the old pool first
+            if self.mongo_client is not None:
+                await self.mongo_client.close()
             self.mongo_client = MongoClient(
                 mongodb_uri=self.mongodb_uri,
                 db_name=db_name or self.db_name,
                 source_collection=self.source_collection_name,
-                target_collection=self.target_collection_name
+                target_collection=self.target_collection_name,
+                # Keep a connection per worker open so the first batch doesn't wait on new sockets
+                min_pool_size=self.max_concurrent,
+                max_pool_size=self.max_concurrent * 2
             )
             # The connect method doesn't return a value, it raises an exception on failure
             await self.mongo_client.connect()
-            logger.info(f"[DEBUG] After connect: db={self.mongo_client.db}, source_collection={self.mongo_client.source_collection}, target_collection={self.mongo_client.target_collection}")
-            try:
-                count = await self.mongo_client.source_collection.count_documents({})
-                logger.info(f"[DEBUG] Source collection document count: {count}")
-            except Exception as e:
-                logger.error(f"[DEBUG] Error counting documents in source collection: {e}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("After connect: db=%s, source_collection=%s, target_collection=%s",
+                             self.mongo_client.db, self.mongo_client.source_collection, self.mongo_client.target_collection)
+                # Collection metadata only; count_documents({}) would scan the whole collection on every (re)connect
+                try:
+                    count = await self.mongo_client.source_collection.estimated_document_count()
+                    logger.debug("Source collection estimated document count: %s", count)
+                except Exception as e:
+                    logger.error(f"Error counting documents in source collection: {e}")
             logger.info("Successfully connected to MongoDB")
             return True
         except Exception as e:
@@ -152,132 +239,91 @@ class BatchProcessor:
             return False
 
     async def close(self):
-    # Close the MongoDB connection.
+    # Close the MongoDB connection. A shared client is left open for its owner.
+        if self._shared_client:
+            return
         if self.mongo_client:
             await self.mongo_client.close()
             logger.info("MongoDB connection closed")
+        await close_session()
             
     async def load_checkpoint(self):
     # Load checkpoint data from previous processing runs.
-        # Placeholder for actual implementation
-        # Example: checkpoint = self.batch_file_manager.load_checkpoint()
-        checkpoint = None
-        if checkpoint:
-            self.last_processed_id = checkpoint.get("last_processed_id")
-            self.stats = checkpoint.get("stats", self.stats)
-        return False
+        checkpoint = await asyncio.to_thread(self.batch_file_manager.load_checkpoint)
+        if not checkpoint:
+            return False
+        self.last_processed_id = checkpoint.get("last_processed_object_id") or checkpoint.get("last_processed_id")
+        restored = checkpoint.get("stats") or {}
+        for key in ("documents_processed", "successful", "failed", "retried", "batches_processed"):
+            if key in restored:
+                self.stats[key] = restored[key]
+        return True
             
     async def save_checkpoint(self):
     # Save current processing state as a checkpoint.
-        # Placeholder for actual implementation
-        # Example: self.batch_file_manager.save_checkpoint({
-        #     "last_processed_id": self.last_processed_id,
-        #     "stats": self.stats,
-        #     "timestamp": datetime.now(timezone.utc).isoformat()
-        # })
-        return False
+    # While run() is active the snapshot is handed to the background writer so
+    # workers never wait on disk; only the newest pending snapshot is kept.
+        self._since_checkpoint = 0
+        snapshot = (self.last_processed_id, dict(self.stats))
+        if self._ckpt_task is None:
+            await asyncio.to_thread(self.batch_file_manager.save_checkpoint, *snapshot)
+            return True
+        if self._ckpt_queue.full():
+            self._ckpt_queue.get_nowait()
+            self._ckpt_queue.task_done()
+        self._ckpt_queue.put_nowait(snapshot)
+        return True
     
-    @async_retry(max_retries=3, base_delay=1.5)
-    async def fetch_unprocessed_queries(self) -> Tuple[List[Dict[str, Any]], bool]:
-        # Fetch a batch of unprocessed customer queries from the source collection. Uses cursor-based pagination for efficient retrieval.
-        logger.info(f"[FETCH] DB: {self.db_name}, Source Collection: {self.source_collection_name}")
+    async def _checkpoint_writer(self):
+    # Background task writing queued checkpoint snapshots to disk.
+        while True:
+            snapshot = await self._ckpt_queue.get()
+            try:
+                await asyncio.to_thread(self.batch_file_manager.save_checkpoint, *snapshot)
+            except Exception as e:
+                logger.error(f"Error saving checkpoint: {str(e)}")
+            finally:
+                self._ckpt_queue.task_done()
+    
+    async def _stop_checkpoint_writer(self):
+    # Wait for pending checkpoints to reach disk, then stop the writer.
+        if self._ckpt_task is None:
+            return
+        await self._ckpt_queue.join()
+        self._ckpt_task.cancel()
         try:
-            documents, first_id, last_id = await self.mongo_client.fetch_unprocessed_documents(batch_size=self.batch_size)
-            more_available = len(documents) >= self.batch_size
-            logger.info(f"Fetched {len(documents)} documents from source collection (more_available={more_available})")
-            return documents, more_available
-        except Exception as e:
-            logger.error(f"Error fetching unprocessed queries: {str(e)}")
-            return [], False
+            await self._ckpt_task
+        except asyncio.CancelledError:
+            pass
+        self._ckpt_task = None
+    
+    async def stream_unprocessed_queries(self):
+    # Yield unprocessed documents one at a time from a single server-side cursor.
+    # Nothing is accumulated, so callers can walk arbitrarily large collections.
+        cursor = self.mongo_client.source_collection.find(
+            UNPROCESSED_FILTER,
+            CLASSIFICATION_PROJECTION
+        ).batch_size(1000)
+        async for document in cursor:
+            yield document
     
     def _prepare_message(self, conversation: str, doc_id: str = None) -> List[Dict[str, str]]:
-        # Prepare message for the LLM using the existing prompt builder.
+    # Prepare message for the LLM from the prebuilt prompt prefix.
         # Args:
         #     conversation: The customer conversation to classify
-        #     doc_id: Optional document ID to use as conversation number
+        #     doc_id: Optional document ID (unused; the prompt does not include it)
         # Returns:
         #     List[Dict]: The messages list with system prompt and few-shot examples
-        try:
-            conversation_number = str(doc_id) if doc_id else str(uuid.uuid4())
-            prompt_result = build_prompt(
-                conversation_number=conversation_number,
-                aggregated_text=conversation
-            )
-            return prompt_result["messages"]
-        except Exception as e:
-            logger.error(f"Error preparing message: {str(e)}")
-            return []
+        return self._prompt_prefix + [
+            {"role": "user", "content": f"{self._user_prefix}{conversation}{self._user_suffix}"}
+        ]
     
-    async def process_batch(self, documents: List[Dict[str, Any]]) -> Dict[str, Any]:
-    # Process a batch of customer queries concurrently.
-        # Args:
-        #     documents: List of documents containing unprocessed queries
-        # Returns:
-        #     Dict: Processing statistics
-        batch_stats = {
-            "total": len(documents),
-            "successful": 0,
-            "failed": 0,
-            "retried": 0,
-            "start_time": datetime.now(timezone.utc),
-            "end_time": None,
-            "duration_seconds": None
-        }
-        
-        if not documents:
-            logger.info("No documents to process")
-            batch_stats["end_time"] = datetime.now(timezone.utc)
-            batch_stats["duration_seconds"] = (batch_stats["end_time"] - batch_stats["start_time"]).total_seconds()
-            return batch_stats
-        
-        logger.info(f"Processing batch of {len(documents)} queries")
-        
-        # Create tasks for concurrent processing
-        tasks = []
-        
-        for doc in documents:
-            task = self._process_document(doc)
-            tasks.append(task)
-        
-        # Run tasks concurrently with the semaphore limiting max concurrency
-        results = await asyncio.gather(*tasks)
-        
-        # Update statistics
-        for result in results:
-            if result["status"] == "success":
-                batch_stats["successful"] += 1
-            else:
-                batch_stats["failed"] += 1
-                
-            if result["retried"]:
-                batch_stats["retried"] += 1
-        
-        batch_stats["end_time"] = datetime.now(timezone.utc)
-        batch_stats["duration_seconds"] = (batch_stats["end_time"] - batch_stats["start_time"]).total_seconds()
-        
-        # Update global stats
-        self.stats["documents_processed"] += batch_stats["total"]
-        self.stats["successful"] += batch_stats["successful"]
-        self.stats["failed"] += batch_stats["failed"]
-        self.stats["retried"] += batch_stats["retried"]
-        self.stats["batches_processed"] += 1
-        
-        # Calculate processing rate and estimated completion
-        if self.stats["documents_processed"] > 0 and self.stats["start_time"]:
-            elapsed = (datetime.now(timezone.utc) - self.stats["start_time"]).total_seconds()
-            self.stats["duration_seconds"] = elapsed
-            
-            if elapsed > 0:
-                self.stats["processing_rate"] = self.stats["documents_processed"] / elapsed
-        
-        # Save checkpoint if we've processed enough documents
-        if self.stats["documents_processed"] % self.checkpoint_interval == 0:
-            await self.save_checkpoint()
-        
-        logger.info(f"Batch processing completed: {batch_stats['successful']} successful, {batch_stats['failed']} failed, {batch_stats['retried']} retried")
-        logger.info(f"Batch processing time: {batch_stats['duration_seconds']:.2f} seconds")
-        
-        return batch_stats
+    async def _classify(self, message: List[Dict[str, str]]) -> Dict[str, Any]:
+    # Classify a prepared message; LLM error replies are raised so retry_with_backoff retries them.
+        classification = await safe_ollama_classify_async(message)
+        if "error" in classification:
+            raise RuntimeError(classification["error"])
+        return classification
     
     async def _process_document(self, document: Dict[str, Any]) -> Dict[str, Any]:
         result = {
@@ -285,95 +331,211 @@ class BatchProcessor:
             "retried": False,
             "doc_id": document.get("_id", "unknown")
         }
-        async with self.semaphore:
+        try:
+            doc_id = document["_id"]
+            conversation_text = normalize_document(document)
+            if not conversation_text.strip():
+                logger.warning("Document %s has no text content in any expected fields", doc_id)
+                self._queue_mark_as_processed(doc_id, {"error": "No text content in document"})
+                return result
+            logger.debug("Processing conversation: %.100s...", conversation_text)
+            message = self._prepare_message(conversation=conversation_text, doc_id=str(doc_id))
+            if not message:
+                logger.error("Failed to prepare message for document %s", doc_id)
+                self._queue_mark_as_processed(doc_id, {"error": "Failed to prepare message"})
+                return result
+            attempts = 0
+            
+            async def classify() -> Dict[str, Any]:
+                nonlocal attempts
+                attempts += 1
+                return await self._classify(message)
+            
             try:
-                doc_id = document["_id"]
-                conversation_text = ""
-                tweets = document.get("tweets", [])
-                if tweets:
-                    for tweet in tweets:
-                        if isinstance(tweet, dict) and "text" in tweet:
-                            sender = "Customer"
-                            conversation_text += f"{sender}: {tweet['text']}\n"
-                if not conversation_text.strip():
-                    messages = document.get("messages", [])
-                    for message in messages:
-                        if isinstance(message, dict):
-                            text = message.get("content") or message.get("text", "")
-                            sender = message.get("sender", "Customer").capitalize()
-                            conversation_text += f"{sender}: {text}\n"
-                if not conversation_text.strip():
-                    if "text" in document:
-                        conversation_text = document["text"]
-                    elif "content" in document:
-                        conversation_text = document["content"]
-                if not conversation_text.strip():
-                    logger.warning(f"Document {doc_id} has no text content in any expected fields")
-                    await self._mark_as_processed(doc_id, {"error": "No text content in document"})
-                    return result
-                logger.info(f"Processing conversation: {conversation_text[:100]}...")
-                message = self._prepare_message(conversation=conversation_text, doc_id=str(doc_id))
-                if not message:
-                    logger.error(f"Failed to prepare message for document {doc_id}")
-                    await self._mark_as_processed(doc_id, {"error": "Failed to prepare message"})
-                    return result
-                retry_count = 0
-                max_attempts = self.max_retries + 1
-                for attempt in range(1, max_attempts + 1):
-                    try:
-                        classification = await safe_ollama_classify_async(message)
-                        if "error" in classification:
-                            logger.warning(f"Classification attempt {attempt} failed for document {doc_id}: {classification['error']}")
-                            if attempt < max_attempts:
-                                retry_count += 1
-                                backoff = 2 ** (attempt - 1)
-                                logger.info(f"Retrying in {backoff} seconds...")
-                                await asyncio.sleep(backoff)
-                                continue
-                            else:
-                                logger.error(f"All classification attempts failed for document {doc_id}")
-                                await self._mark_as_processed(doc_id, classification)
-                                result["retried"] = retry_count > 0
-                                return result
-                        break
-                    except Exception as e:
-                        logger.warning(f"Classification attempt {attempt} error for document {doc_id}: {str(e)}")
-                        if attempt < max_attempts:
-                            retry_count += 1
-                            backoff = 2 ** (attempt - 1)
-                            logger.info(f"Retrying in {backoff} seconds...")
-                            await asyncio.sleep(backoff)
-                        else:
-                            logger.error(f"All classification attempts failed for document {doc_id}: {str(e)}")
-                            await self._mark_as_processed(doc_id, {"error": str(e)})
-                            result["retried"] = retry_count > 0
-                            return result
-                output_doc = dict(document)
-                if "_id" in output_doc:
-                    del output_doc["_id"]  # Remove _id so MongoDB can auto-generate a new one
-                if "status" in output_doc:
-                    del output_doc["status"]  # Remove status field from processed output
-                output_doc["source_document_id"] = document["_id"]  # Reference to original source document
-                output_doc["classification"] = {
+                classification = await retry_with_backoff(
+                    classify, max_retries=self.max_retries, base_delay=1.0
+                )
+            except Exception as e:
+                logger.error("All classification attempts failed for document %s: %s", doc_id, e)
+                self._queue_mark_as_processed(doc_id, {"error": str(e)})
+                result["retried"] = attempts > 1
+                return result
+            retry_count = attempts - 1
+            # Slim record; the conversation itself stays in the source collection
+            # The _id is assigned here so the source status update can carry result_id
+            # without waiting for the insert; both bulk writes still run concurrently
+            output_doc = {
+                "_id": ObjectId(),
+                "source_document_id": doc_id,
+                "classification": {
                     "intent": classification.get("intent", ""),
                     "topic": classification.get("topic", ""),
                     "sentiment": classification.get("sentiment", ""),
                     "categorization": classification.get("categorization", "")
-                }
-                output_doc["processed_at"] = datetime.now(timezone.utc)
-                output_doc["retry_count"] = retry_count
-                await self._store_classification(output_doc)
-                await self._mark_as_processed(doc_id, {
-                    "status": "processed",
-                    "retry_count": retry_count
-                })
-                result["status"] = "success"
-                result["retried"] = retry_count > 0
-                return result
-            except Exception as e:
-                logger.error(f"Error processing document {document.get('_id', 'unknown')}: {str(e)}")
-                await self._mark_as_processed(document.get("_id"), {"error": str(e)})
-                return result
+                },
+                "retry_count": retry_count
+            }
+            self._pending_inserts.append(output_doc)
+            self._queue_mark_as_processed(doc_id, {
+                "status": "processed",
+                "result_id": str(output_doc["_id"]),
+                "retry_count": retry_count
+            })
+            result["status"] = "success"
+            result["retried"] = retry_count > 0
+            return result
+        except Exception as e:
+            logger.error("Error processing document %s: %s", document.get('_id', 'unknown'), e)
+            self._queue_mark_as_processed(document.get("_id"), {"error": str(e)})
+            return result
+    
+    async def _producer(self, queue: asyncio.Queue) -> None:
+    # Stream unprocessed documents from a server-side cursor into the work queue.
+    # Walks _id in order from the checkpointed position, so --recover resumes where the last run stopped.
+    # Ends by sending one None sentinel per worker.
+        query_filter = dict(UNPROCESSED_FILTER)
+        if self.last_processed_id is not None:
+            query_filter["_id"] = {"$gt": self._resume_position()}
+        cursor = self.mongo_client.source_collection.find(
+            query_filter,
+            CLASSIFICATION_PROJECTION
+        ).sort("_id", 1).batch_size(self.batch_size)
+        if os.environ.get("BATCH_PROCESSOR_FORCE_EXIT_AFTER_BATCH") == "true":
+            cursor = cursor.limit(self.batch_size)
+        async for document in cursor:
+            self._dispatched.append(document["_id"])
+            await queue.put(document)
+        for _ in range(self.max_concurrent):
+            await queue.put(None)
+    
+    async def _worker(self, queue: asyncio.Queue) -> None:
+    # Process documents from the queue until a None sentinel arrives.
+        while True:
+            document = await queue.get()
+            if document is None:
+                return
+            self._counts.record(await self._process_document(document))
+            # Flush every batch_size documents so writes stay batched
+            if len(self._pending_updates) >= self.batch_size:
+                await self._end_batch()
+    
+    def _update_rate(self) -> None:
+    # Refresh elapsed time and documents/second from the monotonic start of run().
+        if self._started is None:
+            return
+        elapsed = time.monotonic() - self._started
+        self.stats["duration_seconds"] = elapsed
+        if elapsed > 0:
+            self.stats["processing_rate"] = self.stats["documents_processed"] / elapsed
+    
+    def _resume_position(self) -> Any:
+    # last_processed_id as an ObjectId; checkpoints store it as a hex string.
+        position = self.last_processed_id
+        if isinstance(position, str) and ObjectId.is_valid(position):
+            return ObjectId(position)
+        return position
+    
+    def _advance_position(self, updates: List[Dict[str, Any]]) -> None:
+    # Move last_processed_id to the highest queued id with nothing unflushed before it.
+        flushed = self._flushed_ids
+        flushed.update(update["doc_id"] for update in updates)
+        dispatched = self._dispatched
+        while dispatched and dispatched[0] in flushed:
+            self.last_processed_id = dispatched.popleft()
+            flushed.discard(self.last_processed_id)
+    
+    async def _end_batch(self) -> None:
+    # Flush buffered writes and update batch-level statistics.
+    # Flushes add a variable number of documents, so checkpoints trigger on a running count.
+        await self._flush_writes()
+        processed_before = self.stats["documents_processed"]
+        self._counts.fold_into(self.stats)
+        self.stats["batches_processed"] += 1
+        self._update_rate()
+        self._since_checkpoint += self.stats["documents_processed"] - processed_before
+        if self._since_checkpoint >= self.checkpoint_interval:
+            await self.save_checkpoint()
+    
+    async def _process_stream(self) -> int:
+    # Run one pass over the unprocessed documents with a producer feeding max_concurrent workers.
+    # Mongo fetches overlap with in-flight LLM calls instead of alternating with them.
+        # Returns:
+        #     int: Number of documents processed in this pass
+        processed_before = self.stats["documents_processed"]
+        # Anything left from an interrupted pass is refetched from last_processed_id
+        self._dispatched.clear()
+        self._flushed_ids.clear()
+        # Two documents per worker keeps every worker fed without prefetching far ahead of the LLM
+        queue = asyncio.Queue(maxsize=self.max_concurrent * 2)
+        tasks = [asyncio.create_task(self._producer(queue))]
+        tasks += [asyncio.create_task(self._worker(queue)) for _ in range(self.max_concurrent)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            if self._pending_inserts or self._pending_updates:
+                await self._end_batch()
+            self._counts.fold_into(self.stats)
+        processed = self.stats["documents_processed"] - processed_before
+        logger.info(f"Processed {processed} documents in this pass")
+        return processed
+    
+    def _queue_mark_as_processed(self, doc_id: Any, result: Dict[str, Any] = None) -> None:
+    # Buffer a status update for the source document; written by _flush_writes.
+        result_id = result.get("result_id") if result and isinstance(result, dict) else None
+        self._pending_updates.append({"doc_id": doc_id, "status": "processed", "result_id": result_id})
+    
+    @staticmethod
+    def _failed_indexes(count: int, exc: Exception) -> List[int]:
+    # Positions of the operations that failed in an unordered bulk write.
+        if isinstance(exc, BulkWriteError):
+            return sorted({err["index"] for err in exc.details.get("writeErrors", [])})
+        return list(range(count))
+    
+    async def _flush_writes(self) -> None:
+    # Write buffered classifications and status updates, one round-trip per collection.
+    # The two collections are independent, so both bulk writes run concurrently.
+        inserts, self._pending_inserts = self._pending_inserts, []
+        updates, self._pending_updates = self._pending_updates, []
+        # One timestamp for the whole flush instead of one per document
+        now = datetime.now(timezone.utc)
+        for output_doc in inserts:
+            output_doc["processed_at"] = now
+        
+        _, failed = await asyncio.gather(self._insert_classifications(inserts), self._apply_status_updates(updates, now))
+        # A document whose status write failed is still unprocessed in the source collection,
+        # so the checkpoint position must not move past it or --recover would never refetch it
+        self._advance_position([update for i, update in enumerate(updates) if i not in failed])
+    
+    async def _insert_classifications(self, inserts: List[Dict[str, Any]]) -> None:
+    # Bulk insert classified documents; failed ones are pushed to the retry queue.
+        if not inserts:
+            return
+        try:
+            await self.mongo_client.store_classification_results(inserts)
+            logger.info(f"Stored {len(inserts)} classified documents")
+        except Exception as e:
+            logger.error(f"Error storing classified documents: {str(e)}")
+            for i in self._failed_indexes(len(inserts), e):
+                self.batch_file_manager.add_to_retry_queue(inserts[i], str(e), retry_type="write_failed")
+    
+    async def _apply_status_updates(self, updates: List[Dict[str, Any]], now: datetime) -> Set[int]:
+    # Bulk mark source documents as processed; failed ones are pushed to the retry queue keyed by _id.
+    # Returns the positions of the updates that failed.
+        if not updates:
+            return set()
+        try:
+            await self.mongo_client.update_document_statuses(updates, now=now)
+            logger.info(f"Marked {len(updates)} documents as processed")
+            return set()
+        except Exception as e:
+            logger.error(f"Error marking documents as processed: {str(e)}")
+            failed = self._failed_indexes(len(updates), e)
+            for i in failed:
+                self.batch_file_manager.add_to_retry_queue({"_id": updates[i]["doc_id"]}, str(e), retry_type="write_failed")
+            return set(failed)
     
     @async_retry(max_retries=3, base_delay=1.5)
     async def _mark_as_processed(self, doc_id: Any, result: Dict[str, Any] = None) -> bool:
@@ -395,10 +557,10 @@ class BatchProcessor:
                 result_id=result_id
             )
             
-            logger.info(f"Document {doc_id} marked as {status}")
+            logger.debug("Document %s marked as %s", doc_id, status)
             return True
         except Exception as e:
-            logger.error(f"Error marking document {doc_id} as processed: {str(e)}")
+            logger.error("Error marking document %s as processed: %s", doc_id, e)
             # If we fail after retries, save to retry queue
         #     Dict: Processing statistics for retry queue
         retry_stats = {
@@ -471,6 +633,8 @@ class BatchProcessor:
             
         # Initialize statistics
         self.stats["start_time"] = datetime.now(timezone.utc)
+        self._started = time.monotonic()
+        self._ckpt_task = asyncio.create_task(self._checkpoint_writer())
         
         # Load checkpoint if recovering
         if recover:
@@ -482,28 +646,24 @@ class BatchProcessor:
             logger.info(f"Processed {retry_stats['retried']} items from retry queue: {retry_stats['successful']} successful, {retry_stats['failed']} failed")
         
         try:
-            # Main processing loop
+            # Main processing loop: each pass drains the unprocessed documents
             while True:
-                documents, more_available = await self.fetch_unprocessed_queries()
-                if not documents:
-                    # No documents to process, exit loop
-                    break
-                # Actually process the batch of documents
-                await self.process_batch(documents)
-                # Process retry queue periodically
-                if self.stats["batches_processed"] % 5 == 0:
-                    await self.process_retry_queue()
+                processed = await self._process_stream()
                 # Check for force exit after one batch (for debugging)
                 if os.environ.get("BATCH_PROCESSOR_FORCE_EXIT_AFTER_BATCH") == "true":
                     logger.info("Force exit after processing one batch (BATCH_PROCESSOR_FORCE_EXIT_AFTER_BATCH=true)")
                     break
-                # Check if we should exit (not continuous mode and no more documents)
-                if not more_available and self.mode != "continuous":
+                if self.mode != "continuous":
                     logger.info("No more documents available, finishing processing")
                     break
-                # Checkpoint regularly in continuous mode
-                if self.mode == "continuous" and self.stats["batches_processed"] % 10 == 0:
+                # Between passes in continuous mode, retry failures, checkpoint and wait for new documents
+                if processed:
+                    await self.process_retry_queue()
                     await self.save_checkpoint()
+                # Later passes rescan from the first _id: documents whose status write failed, or that
+                # were reset to pending below the checkpoint, would otherwise never be fetched again
+                self.last_processed_id = None
+                await asyncio.sleep(self.continuous_interval)
         
         except asyncio.CancelledError:
             logger.info("Batch processor cancelled")
@@ -517,8 +677,7 @@ class BatchProcessor:
         finally:
             self.stats["end_time"] = datetime.now(timezone.utc)
             
-            if self.stats["start_time"]:
-                self.stats["duration_seconds"] = (self.stats["end_time"] - self.stats["start_time"]).total_seconds()
+            self._update_rate()
             
             logger.info(f"Batch processor finished: {self.stats['documents_processed']} documents processed")
             logger.info(f"Successful: {self.stats['successful']}, Failed: {self.stats['failed']}, Retried: {self.stats['retried']}")
@@ -526,6 +685,7 @@ class BatchProcessor:
             
             # Save final checkpoint
             await self.save_checkpoint()
+            await self._stop_checkpoint_writer()
             
             # Don't close connection if we're running in continuous mode and had no errors
             if self.mode != "continuous" or "error" in self.stats:
@@ -534,7 +694,7 @@ class BatchProcessor:
             return self.stats
 
 
-async def main():
+async def main(argv: Optional[List[str]] = None):
     # Main function for command-line execution.
     import argparse
     
@@ -558,7 +718,7 @@ async def main():
     parser.add_argument("--continuous", action="store_true", help="Run in continuous mode (legacy)")
     parser.add_argument("--wait-time", type=int, default=60, help="Wait time between batches (legacy)")
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     
     # Handle legacy arguments
     mode = args.mode
@@ -588,8 +748,19 @@ async def main():
         recover=args.recover
     )
     
-    print(json.dumps(stats, indent=2, default=str))
+    print(orjson.dumps(stats, default=str, option=orjson.OPT_INDENT_2).decode())
+
+
+def run_main(argv: Optional[List[str]] = None) -> None:
+    """Run main() on uvloop when it is installed, otherwise on the stdlib loop."""
+    # uvloop is optional (it has no Windows build); fall back to the stdlib loop
+    try:
+        import uvloop
+    except ImportError:
+        asyncio.run(main(argv))
+    else:
+        uvloop.run(main(argv))
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    run_main()
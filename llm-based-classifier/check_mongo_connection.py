@@ -1,14 +1,28 @@
 import asyncio
 import json
 from datetime import datetime
-from motor.motor_asyncio import AsyncIOMotorClient
+from config.settings import SETTINGS
+from utils.mongo_utils import get_client, list_user_database_names
+
+# Returns only the top-level field names of one random document, not the document itself
+SAMPLE_FIELDS_PIPELINE = [
+    {"$sample": {"size": 1}},
+    {"$project": {"_id": 0, "fields": {"$map": {"input": {"$objectToArray": "$$ROOT"}, "in": "$$this.k"}}}}
+]
+
+async def sample_fields(collection):
+    # Field names of one sample document, or None if the collection is empty
+    docs = await collection.aggregate(SAMPLE_FIELDS_PIPELINE).to_list(length=1)
+    return docs[0]["fields"] if docs else None
+
+async def probe_collection(collection):
+    # Fetch a collection's document count and sample field names concurrently
+    return await asyncio.gather(collection.estimated_document_count(), sample_fields(collection))
 
 async def check_mongodb():
     # Connect to MongoDB
-    import os
-    mongodb_uri = os.getenv("MONGODB_URI")
-    print(f"Connecting to MongoDB: {mongodb_uri}")
-    client = AsyncIOMotorClient(mongodb_uri)
+    print(f"Connecting to MongoDB: {SETTINGS.mongodb_uri}")
+    client = get_client()
     
     # Check server info
     try:
@@ -20,36 +34,37 @@ async def check_mongodb():
     
     # Check database names
     try:
-        db_names = await client.list_database_names()
+        db_names = await list_user_database_names(client)
         print('Available databases:')
         for db in db_names:
-            if db not in ['admin', 'local', 'config']:  # Skip system dbs
-                print(f'- {db}')
+            print(f'- {db}')
     except Exception as e:
         print(f"Failed to list databases: {str(e)}")
         return
     
     # Try to access specific database
-    db_names = [os.getenv("MONGODB_DB", "customer_support_triad"), "customer_support"]
+    db_names = [SETTINGS.db, "customer_support"]
     for db_name in db_names:
         try:
             db = client[db_name]
-            collection_names = await db.list_collection_names()
+            collection_names = await db.list_collection_names(authorizedCollections=True)
             print(f'\nCollections in {db_name}:')
-            for collection in collection_names:
+            # Probe every collection concurrently instead of one round trip at a time
+            results = await asyncio.gather(
+                *(probe_collection(db[collection]) for collection in collection_names),
+                return_exceptions=True
+            )
+            for collection, result in zip(collection_names, results):
                 print(f'- {collection}')
+                if isinstance(result, Exception):
+                    print(f"  Error counting documents in {collection}: {str(result)}")
+                    continue
+                count, fields = result
+                print(f'  {collection}: {count} documents')
                 
-                # Count documents in each collection
-                try:
-                    count = await db[collection].count_documents({})
-                    print(f'  {collection}: {count} documents')
-                    
-                    # Get one sample document
-                    if count > 0:
-                        sample = await db[collection].find_one({})
-                        print(f"  Sample document fields: {list(sample.keys())}")
-                except Exception as e:
-                    print(f"  Error counting documents in {collection}: {str(e)}")
+                # Show the fields of one sample document
+                if fields is not None:
+                    print(f"  Sample document fields: {fields}")
         except Exception as e:
             print(f"Error accessing database {db_name}: {str(e)}")
 
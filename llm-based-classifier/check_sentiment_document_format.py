@@ -3,66 +3,59 @@ check_sentiment_document_format.py
 Script to show the complete document format of entries in the sentimental_analysis collection.
 """
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
-import json
-from bson import ObjectId
-from datetime import datetime
-
-# Create a custom JSON encoder to handle MongoDB-specific types
-class MongoJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, ObjectId):
-            return str(obj)
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
+import sys
+import orjson
+from config.settings import SETTINGS
+from utils.mongo_utils import bson_default, get_client
 
 async def check_document_format():
     """Check the full document structure in the sentimental_analysis collection."""
     
-    # Connect to MongoDB
-    print("Connecting to MongoDB...")
-    import os
-    mongodb_uri = os.getenv("MONGODB_URI")
-    client = AsyncIOMotorClient(mongodb_uri)
+    # Output is collected and written once at the end rather than line by line
+    lines = []
+    emit = lines.append
+    try:
+        # Connect to MongoDB
+        emit("Connecting to MongoDB...")
+        client = get_client()
     
-    # Connect to the database and collection
-    db_name = os.getenv("MONGODB_DB", "customer_support_triad")
-    collection_name = os.getenv("MONGODB_TARGET_COLLECTION", "sentimental_analysis")
-    db = client[db_name]
-    collection = db[collection_name]
+        # Connect to the database and collection
+        db_name = SETTINGS.db
+        collection_name = SETTINGS.target_collection
+        db = client[db_name]
+        collection = db[collection_name]
     
-    # Count documents
-    count = await collection.count_documents({})
-    print(f"Found {count} documents in sentimental_analysis collection")
+        # Count, the two newest and the oldest document are fetched concurrently
+        count, documents, oldest = await asyncio.gather(
+            collection.estimated_document_count(),
+            collection.find().sort("processed_at", -1).limit(2).batch_size(2).to_list(length=2),
+            collection.find_one(sort=[("processed_at", 1)])
+        )
+        emit(f"Found {count} documents in sentimental_analysis collection")
     
-    if count > 0:
-        # Get the most recent documents
-        cursor = collection.find().sort("processed_at", -1).limit(2)
-        
-        print("\n=== RECENT DOCUMENT FORMAT ===")
-        documents = []
-        async for doc in cursor:
-            documents.append(doc)
+        if documents:
+            emit("\n=== RECENT DOCUMENT FORMAT ===")
         
-        # Print the full document structure
-        for i, doc in enumerate(documents):
-            print(f"\n--- Document {i+1} ---")
-            # Convert to JSON with indentation for better readability
-            # Use custom encoder to handle MongoDB types
-            doc_json = json.dumps(doc, cls=MongoJSONEncoder, indent=2)
-            print(doc_json)
+            # Print the full document structure
+            for i, doc in enumerate(documents):
+                emit(f"\n--- Document {i+1} ---")
+                # Convert to JSON with indentation for better readability
+                # bson_default handles MongoDB types orjson can't encode natively
+                doc_json = orjson.dumps(doc, default=bson_default, option=orjson.OPT_INDENT_2).decode()
+                emit(doc_json)
             
-        # Get older documents for comparison
-        print("\n=== OLDER DOCUMENT FORMAT ===")
-        cursor = collection.find().sort("processed_at", 1).limit(1)
-        async for doc in cursor:
-            print("\n--- Older Document ---")
-            doc_json = json.dumps(doc, cls=MongoJSONEncoder, indent=2)
-            print(doc_json)
+            # Get older documents for comparison
+            emit("\n=== OLDER DOCUMENT FORMAT ===")
+            if oldest is not None:
+                emit("\n--- Older Document ---")
+                doc_json = orjson.dumps(oldest, default=bson_default, option=orjson.OPT_INDENT_2).decode()
+                emit(doc_json)
     
-    else:
-        print("No documents found in the collection")
+        else:
+            emit("No documents found in the collection")
+    finally:
+        sys.stdout.write("\n".join(lines) + "\n")
+
 
 if __name__ == '__main__':
     asyncio.run(check_document_format())
\ No newline at end of file
@@ -3,36 +3,38 @@ check_source_documents.py
 Script to check which documents would be selected from the source collection.
 """
 import asyncio
+from config.settings import SETTINGS
 from mongo_client import MongoClient
-import json
-from bson import ObjectId
 
-# Custom JSON encoder to handle ObjectId
-class MongoJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, ObjectId):
-            return str(obj)
-        return super().default(obj)
+# Only the first tweet is returned; the server reports how many there are
+SOURCE_PREVIEW_PROJECTION = {
+    "conversation_number": 1,
+    "tweets": {"$slice": 1},
+    "tweet_count": {"$size": {"$ifNull": ["$tweets", []]}}
+}
 
 async def check_source_documents():
     # Initialize MongoDB client using environment variables
-    import os
     mongo_client = MongoClient(
-        db_name=os.getenv("MONGODB_DB", "customer_support_triad"),
-        source_collection=os.getenv("MONGODB_SOURCE_COLLECTION", "conversation_set"),
-        target_collection=os.getenv("MONGODB_TARGET_COLLECTION", "sentimental_analysis")
+        mongodb_uri=SETTINGS.mongodb_uri,
+        db_name=SETTINGS.db,
+        source_collection=SETTINGS.source_collection,
+        target_collection=SETTINGS.target_collection
     )
     
     try:
         # Connect to MongoDB
         print("Connecting to MongoDB...")
-        await mongo_client.connect()
+        await mongo_client.connect(verify=True)
         print("Connected successfully")
         
         # Fetch documents that would be processed
         batch_size = 5  # Show more than just 2 to give a better picture
         print(f"Checking the first {batch_size} unprocessed documents...")
-        documents, first_id, last_id = await mongo_client.fetch_unprocessed_documents(batch_size=batch_size)
+        documents, first_id, last_id = await mongo_client.fetch_unprocessed_documents(
+            batch_size=batch_size,
+            projection=SOURCE_PREVIEW_PROJECTION
+        )
         
         print(f"Found {len(documents)} unprocessed documents")
         
@@ -41,7 +43,7 @@ async def check_source_documents():
             for i, doc in enumerate(documents):
                 doc_id = str(doc["_id"])
                 conversation_number = doc.get("conversation_number", "unknown")
-                tweets_count = len(doc.get("tweets", []))
+                tweets_count = doc.get("tweet_count", 0)
                 
                 print(f"{i+1}. Document ID: {doc_id}")
                 print(f"   Conversation Number: {conversation_number}")
@@ -8,7 +8,7 @@ def parse_classification(response):
     Parses LLM output and validates classification schema (intent, topic, sentiment).
     Returns parsed result or error response.
     """
-    import json
+    import orjson
     from logger import logger
     from error_handler import error_response
     try:
@@ -17,7 +17,7 @@ def parse_classification(response):
             return error_response("Empty LLM response")
         # Parse response (assume JSON string)
         if isinstance(response, str):
-            classification = json.loads(response)
+            classification = orjson.loads(response)
         elif isinstance(response, dict):
             classification = response
         else:
@@ -35,7 +35,7 @@ def parse_classification(response):
                 return error_response(f"Missing field in classification: {field}")
         logger.info(f"Classification parsed: {class_obj}")
         return class_obj
-    except json.JSONDecodeError:
+    except orjson.JSONDecodeError:
         logger.error("Failed to parse LLM response as JSON")
         return error_response("Failed to parse LLM response as JSON")
     except Exception as e:
@@ -1,35 +1,36 @@
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
+from config.settings import SETTINGS
+from utils.mongo_utils import get_client
 
 async def cleanup_mongodb():
     # Connect to MongoDB
-    import os
-    mongodb_uri = os.getenv("MONGODB_URI")
-    client = AsyncIOMotorClient(mongodb_uri)
+    client = get_client()
     
     # Use the database from environment variable
-    db_name = os.getenv("MONGODB_DB", "customer_support_triad")
+    db_name = SETTINGS.db
     db = client[db_name]
     
     print("=== CLEANING UP DATABASE: customer_support_triad ===")
     
     # Check if collections exist
-    collection_names = await db.list_collection_names()
+    collection_names = await db.list_collection_names(authorizedCollections=True)
     
     for collection_name in collection_names:
-        # Get current document count
-        count_before = await db[collection_name].count_documents({})
+        # Get current document count from collection metadata
+        count_before = await db[collection_name].estimated_document_count()
         
-        # Delete all documents in the collection
-        result = await db[collection_name].delete_many({})
+        # Drop the collection rather than deleting documents one by one;
+        # MongoClient recreates its indexes on the next connect
+        await db[collection_name].drop()
         
-        print(f"Collection '{collection_name}': Deleted {result.deleted_count} of {count_before} documents")
+        print(f"Collection '{collection_name}': Dropped ({count_before} documents)")
     
-    # Verify collections are empty
+    # Verify collections are gone
     print("\n=== VERIFICATION ===")
+    remaining = await db.list_collection_names(authorizedCollections=True)
     for collection_name in collection_names:
-        count = await db[collection_name].count_documents({})
-        print(f"Collection '{collection_name}' now has {count} documents")
+        status = "still exists" if collection_name in remaining else "dropped"
+        print(f"Collection '{collection_name}' {status}")
 
 if __name__ == "__main__":
     asyncio.run(cleanup_mongodb())
\ No newline at end of file
@@ -10,14 +10,30 @@ import argparse
 import asyncio
 import logging
 from datetime import datetime
-import json
+import orjson
 
+from async_llm_wrapper import close_session
 from batch_processor import BatchProcessor
+from mongo_client import MongoClient
 import logger
 
 # Setup logger
 logger = logging.getLogger("customer_support_query_classification")
 
+# UNIX socket the --daemon server listens on and --client connects to
+DEFAULT_SOCKET = "/tmp/llm-classifier.sock"
+
+# Per-job options a --client forwards; connection settings are fixed by the daemon
+JOB_OPTIONS = ("batch_size", "max_concurrent", "dry_run", "output")
+
+# Dry-run NDJSON lines are handed to a worker thread in chunks of this many documents
+OUTPUT_CHUNK_SIZE = 1000
+
+def write_file(path, data):
+    """Write bytes to path (run via asyncio.to_thread so the event loop isn't blocked)."""
+    with open(path, 'wb') as f:
+        f.write(data)
+
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -78,7 +94,7 @@ def parse_arguments():
     parser.add_argument(
         "--output",
         type=str,
-        help="Output file path to save processing results (JSON format)"
+        help="Output file path to save processing results (JSON format; NDJSON of the fetched queries with --dry-run)"
     )
     
     parser.add_argument(
@@ -86,11 +102,39 @@ def parse_arguments():
         action="store_true",
         help="Fetch documents but don't process them or store results"
     )
+    
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help="Keep one MongoDB connection open and run jobs sent by --client over a UNIX socket"
+    )
+    
+    parser.add_argument(
+        "--client",
+        action="store_true",
+        help="Send this job to a running --daemon instead of connecting to MongoDB directly"
+    )
+    
+    parser.add_argument(
+        "--socket",
+        type=str,
+        default=DEFAULT_SOCKET,
+        help="UNIX socket path used by --daemon and --client"
+    )
 
     return parser.parse_args()
 
-async def run_batch_processor(args):
-    """Run the batch processor with the specified arguments."""
+async def run_batch_processor(args, mongo_client=None):
+    """
+    Run the batch processor with the specified arguments.
+    
+    Args:
+        args: Parsed command line arguments
+        mongo_client: Optional connected MongoClient to reuse instead of opening a new one
+    
+    Returns:
+        dict: Processing statistics, or a document count summary for dry runs
+    """
     # Configure logging level
     logging.getLogger("customer_support_query_classification").setLevel(
         getattr(logging, args.log_level)
@@ -108,7 +152,8 @@ async def run_batch_processor(args):
             source_collection=args.queries_collection,
             target_collection=args.results_collection,
             batch_size=args.batch_size,
-            max_concurrent=args.max_concurrent
+            max_concurrent=args.max_concurrent,
+            mongo_client=mongo_client
         )
         
         if args.dry_run:
@@ -117,35 +162,41 @@ async def run_batch_processor(args):
                 # Connect to MongoDB
                 await processor.connect()
                 
-                # Fetch documents but don't process them
-                all_queries = []
-                batch_num = 1
-                
-                while True:
-                    try:
-                        queries = await processor.fetch_unprocessed_queries()
-                        if not queries:
-                            break
-                            
-                        logger.info(f"Batch {batch_num}: Found {len(queries)} unprocessed queries")
-                        all_queries.extend(queries)
-                        batch_num += 1
-                    except Exception as e:
-                        logger.error(f"Error fetching batch {batch_num}: {e}")
-                        break
+                # Stream documents without processing them; only a running count and
+                # the first few samples are kept, and --output is written as NDJSON
+                total = 0
+                samples = []
+                chunk = []
+                output = open(args.output, 'wb') if args.output else None
+                try:
+                    async for query in processor.stream_unprocessed_queries():
+                        total += 1
+                        if len(samples) < 5:
+                            samples.append(query)
+                        if output:
+                            chunk.append(orjson.dumps(query, default=str))
+                            if len(chunk) >= OUTPUT_CHUNK_SIZE:
+                                await asyncio.to_thread(output.write, b"\n".join(chunk) + b"\n")
+                                chunk = []
+                except Exception as e:
+                    logger.error(f"Error fetching unprocessed queries: {e}")
+                finally:
+                    if output:
+                        if chunk:
+                            await asyncio.to_thread(output.write, b"\n".join(chunk) + b"\n")
+                        output.close()
                     
-                logger.info(f"Total unprocessed queries: {len(all_queries)}")
+                logger.info(f"Total unprocessed queries: {total}")
                 
                 # Output sample of queries
-                if all_queries:
+                if samples:
                     logger.info("Sample queries:")
-                    for i, query in enumerate(all_queries[:5]):
+                    for i, query in enumerate(samples):
                         logger.info(f"{i+1}. {query.get('text', 'No text available')}")
                         
-                    if args.output:
-                        with open(args.output, 'w') as f:
-                            json.dump(all_queries, f, default=str, indent=2)
-                        logger.info(f"Wrote {len(all_queries)} queries to {args.output}")
+                if output:
+                    logger.info(f"Wrote {total} queries to {args.output}")
+                return {"unprocessed_queries": total}
             finally:
                 # Close MongoDB connection
                 try:
@@ -172,9 +223,13 @@ async def run_batch_processor(args):
                 
                 # Save results to file if requested
                 if args.output:
-                    with open(args.output, 'w') as f:
-                        json.dump(stats, f, default=str, indent=2)
+                    await asyncio.to_thread(
+                        write_file,
+                        args.output,
+                        orjson.dumps(stats, default=str, option=orjson.OPT_INDENT_2)
+                    )
                     logger.info(f"Saved processing statistics to {args.output}")
+                return stats
             except Exception as e:
                 logger.error(f"Error during batch processing: {e}")
                 raise
@@ -182,11 +237,87 @@ async def run_batch_processor(args):
         logger.error(f"Failed to initialize batch processor: {e}")
         raise
 
+async def serve_daemon(args):
+    """
+    Serve batch jobs over a UNIX socket, reusing one MongoDB connection.
+    
+    Each connection sends one JSON line of job options and receives one JSON
+    line with the result. Jobs run one at a time so they never race on the
+    same unprocessed documents.
+    """
+    mongo_client = MongoClient(
+        mongodb_uri=args.mongodb_uri,
+        db_name=args.db_name,
+        source_collection=args.queries_collection,
+        target_collection=args.results_collection
+    )
+    await mongo_client.connect(verify=True)
+    job_lock = asyncio.Lock()
+    
+    async def handle_job(reader, writer):
+        try:
+            request = orjson.loads(await reader.readline())
+            job_args = argparse.Namespace(**{
+                **vars(args),
+                **{key: request[key] for key in JOB_OPTIONS if key in request}
+            })
+            async with job_lock:
+                result = await run_batch_processor(job_args, mongo_client=mongo_client)
+            response = {"status": "ok", "result": result}
+        except Exception as e:
+            logger.error(f"Daemon job failed: {e}")
+            response = {"status": "error", "error": str(e)}
+        writer.write(orjson.dumps(response, default=str) + b"\n")
+        await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+    
+    server = await asyncio.start_unix_server(handle_job, path=args.socket)
+    logger.info(f"Batch processor daemon listening on {args.socket}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await mongo_client.close()
+        await close_session()
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+
+async def send_to_daemon(args):
+    """Send this invocation's job options to a running daemon and return its result."""
+    request = {key: getattr(args, key) for key in JOB_OPTIONS}
+    if request["output"]:
+        # The daemon may run from a different working directory
+        request["output"] = os.path.abspath(request["output"])
+    
+    reader, writer = await asyncio.open_unix_connection(args.socket)
+    try:
+        writer.write(orjson.dumps(request) + b"\n")
+        await writer.drain()
+        response = orjson.loads(await reader.readline())
+    finally:
+        writer.close()
+        await writer.wait_closed()
+    
+    if response["status"] != "ok":
+        raise RuntimeError(response["error"])
+    logger.info(f"Daemon job completed: {response['result']}")
+    return response["result"]
+
 def main():
     """Main entry point for the CLI."""
     args = parse_arguments()
+    if (args.daemon or args.client) and not hasattr(asyncio, "start_unix_server"):
+        logger.error("--daemon and --client need UNIX socket support, which this platform lacks")
+        return 1
+    if args.daemon:
+        job = serve_daemon(args)
+    elif args.client:
+        job = send_to_daemon(args)
+    else:
+        job = run_batch_processor(args)
     try:
-        asyncio.run(run_batch_processor(args))
+        asyncio.run(job)
         return 0
     except KeyboardInterrupt:
         logger.info("Process interrupted by user")
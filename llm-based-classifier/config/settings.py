@@ -0,0 +1,34 @@
+"""
+Settings shared by the diagnostic scripts.
+Resolved once from the environment (and .env) at import.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+@dataclass(frozen=True, slots=True)
+class Settings:
+    """MongoDB connection and collection names."""
+    mongodb_uri: Optional[str]
+    db: str
+    source_collection: str
+    target_collection: str
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        """Build settings from environment variables, with the scripts' defaults."""
+        return cls(
+            mongodb_uri=os.getenv("MONGODB_URI"),
+            db=os.getenv("MONGODB_DB", "customer_support_triad"),
+            source_collection=os.getenv("MONGODB_SOURCE_COLLECTION", "conversation_set"),
+            target_collection=os.getenv("MONGODB_TARGET_COLLECTION", "sentimental_analysis")
+        )
+
+
+SETTINGS = Settings.from_env()
@@ -3,12 +3,16 @@ list_mongo_collections.py
 Script to list all collections in the MongoDB database to verify the correct collection name.
 """
 import asyncio
+import sys
 from mongo_client import MongoClient
 from logger import logger
 
 async def list_collections():
     """List all collections in the MongoDB database."""
-    print("Connecting to MongoDB...")
+    # Output is collected and written once at the end rather than line by line
+    lines = []
+    emit = lines.append
+    emit("Connecting to MongoDB...")
     
     # Initialize MongoDB client - use the same connection parameters as batch_processor
     mongo_client = MongoClient(
@@ -19,57 +23,70 @@ async def list_collections():
     
     try:
         # Connect to MongoDB
-        await mongo_client.connect()
-        print("Connected to MongoDB successfully")
+        await mongo_client.connect(verify=True)
+        emit("Connected to MongoDB successfully")
         
         # List all collections in the database
-        collection_names = await mongo_client.db.list_collection_names()
+        collection_names = await mongo_client.db.list_collection_names(authorizedCollections=True)
         
-        print(f"\nCollections in database '{mongo_client.db.name}':")
+        emit(f"\nCollections in database '{mongo_client.db.name}':")
         for idx, collection in enumerate(sorted(collection_names), 1):
-            print(f"{idx}. {collection}")
+            emit(f"{idx}. {collection}")
         
         # Get counts for each collection
-        print("\nDocument counts:")
-        for collection in sorted(collection_names):
-            count = await mongo_client.db[collection].count_documents({})
-            print(f"{collection}: {count} documents")
+        # Counts come from collection metadata rather than a scan of each collection,
+        # and the latest target document is fetched alongside them
+        emit("\nDocument counts:")
+        ordered = sorted(collection_names)
+        target_collection = mongo_client.target_collection_name
+        has_target = target_collection in collection_names
+        results = await asyncio.gather(
+            *(mongo_client.db[collection].estimated_document_count() for collection in ordered),
+            *([mongo_client.db[target_collection].find_one(
+                {},
+                {"_id": 1, "source_object_id": 1, "processed_at": 1, "classification": 1},
+                sort=[("processed_at", -1)]
+            )] if has_target else [])
+        )
+        counts = dict(zip(ordered, results))
+        doc = results[-1] if has_target else None
+        for collection in ordered:
+            emit(f"{collection}: {counts[collection]} documents")
             
         # Check for specific collections
-        target_collection = mongo_client.target_collection_name
-        if target_collection in collection_names:
-            print(f"\nTarget collection '{target_collection}' exists with {await mongo_client.db[target_collection].count_documents({})} documents")
+        if has_target:
+            emit(f"\nTarget collection '{target_collection}' exists with {counts[target_collection]} documents")
             
             # Show the most recent document in the target collection
-            cursor = mongo_client.db[target_collection].find({}).sort("processed_at", -1).limit(1)
-            async for doc in cursor:
-                print(f"\nMost recent document in '{target_collection}':")
-                print(f"ID: {doc.get('_id')}")
-                print(f"Source Object ID: {doc.get('source_object_id')}")
-                print(f"Processed At: {doc.get('processed_at')}")
+            if doc is not None:
+                emit(f"\nMost recent document in '{target_collection}':")
+                emit(f"ID: {doc.get('_id')}")
+                emit(f"Source Object ID: {doc.get('source_object_id')}")
+                emit(f"Processed At: {doc.get('processed_at')}")
                 
                 # Print classification data
                 classification = doc.get('classification', {})
                 if isinstance(classification, dict):
-                    print("Classification data:")
+                    emit("Classification data:")
                     for key, value in classification.items():
-                        print(f"  {key}: {value}")
+                        emit(f"  {key}: {value}")
                 else:
-                    print(f"Classification (not a dict): {classification}")
+                    emit(f"Classification (not a dict): {classification}")
         else:
-            print(f"\nWARNING: Target collection '{target_collection}' does not exist!")
+            emit(f"\nWARNING: Target collection '{target_collection}' does not exist!")
             
             # Check for similar named collections
             similar_collections = [coll for coll in collection_names if "sentiment" in coll.lower()]
             if similar_collections:
-                print(f"Found similar collections: {', '.join(similar_collections)}")
+                emit(f"Found similar collections: {', '.join(similar_collections)}")
             
     except Exception as e:
-        print(f"Error: {str(e)}")
+        emit(f"Error: {str(e)}")
     finally:
         # Close MongoDB connection
         await mongo_client.close()
-        print("\nConnection closed")
+        emit("\nConnection closed")
+        sys.stdout.write("\n".join(lines) + "\n")
 
 if __name__ == "__main__":
     asyncio.run(list_collections())
\ No newline at end of file
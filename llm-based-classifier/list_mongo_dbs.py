@@ -1,30 +1,31 @@
 import asyncio
-from motor.motor_asyncio import AsyncIOMotorClient
+from utils.mongo_utils import get_client, list_user_database_names
+
+async def describe_database(db_obj):
+    # List a database's collections with their document counts, counting them concurrently
+    collections = await db_obj.list_collection_names(authorizedCollections=True)
+    counts = await asyncio.gather(*(db_obj[coll].estimated_document_count() for coll in collections))
+    return list(zip(collections, counts))
 
 async def list_databases_and_collections():
     # Connect to MongoDB
-    import os
-    mongodb_uri = os.getenv("MONGODB_URI")
-    client = AsyncIOMotorClient(mongodb_uri)
+    client = get_client()
     
     # List all databases
     print("=== DATABASES ===")
-    db_names = await client.list_database_names()
-    for db in db_names:
-        if db not in ['admin', 'local', 'config']:  # Skip system dbs
-            print(f"Database: {db}")
-            
-            # List collections in this database
-            db_obj = client[db]
-            collections = await db_obj.list_collection_names()
-            if collections:
-                print("  Collections:")
-                for coll in collections:
-                    count = await db_obj[coll].count_documents({})
-                    print(f"    - {coll} ({count} documents)")
-            else:
-                print("  No collections")
-            print()
+    db_names = await list_user_database_names(client)
+    
+    # Describe every database concurrently, then print in listing order
+    descriptions = await asyncio.gather(*(describe_database(client[db]) for db in db_names))
+    for db, collections in zip(db_names, descriptions):
+        print(f"Database: {db}")
+        if collections:
+            print("  Collections:")
+            for coll, count in collections:
+                print(f"    - {coll} ({count} documents)")
+        else:
+            print("  No collections")
+        print()
 
 # Run the async function
 if __name__ == "__main__":
@@ -12,7 +12,7 @@ def ollama_classify(messages):
     """
     import os
     import requests
-    import json
+    import orjson
     from logger import logger
     from error_handler import error_response
     try:
@@ -42,7 +42,7 @@ def ollama_classify(messages):
             logger.error("Empty LLM response content")
             return error_response("Empty LLM response content")
         try:
-            parsed = json.loads(content)
+            parsed = orjson.loads(content)
             logger.info(f"Extracted JSON object: {parsed}")
             return parsed
         except Exception as e:
@@ -51,7 +51,7 @@ def ollama_classify(messages):
             start, end = content.find("{"), content.rfind("}")
             if start != -1 and end != -1:
                 try:
-                    parsed = json.loads(content[start:end+1])
+                    parsed = orjson.loads(content[start:end+1])
                     logger.info(f"Extracted JSON substring: {parsed}")
                     return parsed
                 except Exception as e2:
@@ -8,10 +8,28 @@ import asyncio
 import json
 from datetime import datetime, timezone
 from typing import Dict, List, Any, Optional, Union
+from bson import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection
+from pymongo import ReturnDocument, UpdateOne
 from logger import logger
 from utils.retry_utils import async_retry
 
+# Every status a source document can hold before it is processed; None also matches
+# documents that have no status field yet. Equality matches on these give tight
+# {status, _id} index bounds, where {"$ne": "processed"} walks every other status key.
+UNPROCESSED_FILTER = {"status": {"$in": [None, "pending", "processing", "failed"]}}
+
+# Fields of a source document that build_result_document and status checks read;
+# anything else (e.g. raw payloads added upstream) stays on the server
+SOURCE_DOCUMENT_PROJECTION = {
+    "conversation_number": 1,
+    "tweets": 1,
+    "messages": 1,
+    "customer": 1,
+    "status": 1,
+    "processing_attempts": 1
+}
+
 class MongoClient:
     """
     Asynchronous MongoDB client for batch processing.
@@ -67,12 +85,21 @@ class MongoClient:
         self.db = None
         self.source_collection = None
         self.target_collection = None
+        self._index_task: Optional[asyncio.Task] = None
     
-    async def connect(self) -> None:
+    async def connect(self, verify: bool = False) -> None:
         """
         Connect to MongoDB and set up collections.
-        Creates indexes if they don't exist.
+        Creates indexes if they don't exist, in the background.
+        
+        Args:
+            verify: Round-trip to the server before returning. Without it an
+                unreachable server surfaces on the first real operation, after
+                serverSelectionTimeoutMS.
         """
+        # Reconnecting must not strand the previous client's connection pool
+        if self.client is not None:
+            await self.close()
         try:
             logger.info(f"Connecting to MongoDB: {self.mongodb_uri}")
             self.client = AsyncIOMotorClient(self.mongodb_uri, **self.connection_params)
@@ -80,28 +107,54 @@ class MongoClient:
             self.source_collection = self.db[self.source_collection_name]
             self.target_collection = self.db[self.target_collection_name]
             logger.info(f"[DEBUG] After connect: db={self.db}, source_collection={self.source_collection}, target_collection={self.target_collection}")
-            # Test connection by requesting server info
-            server_info = await self.client.server_info()
-            logger.info(f"Connected to MongoDB version {server_info.get('version', 'unknown')}")
-            # Create indexes if they don't exist
-            await self._create_indexes()
+            if verify:
+                # Test connection by requesting server info
+                server_info = await self.client.server_info()
+                logger.info(f"Connected to MongoDB version {server_info.get('version', 'unknown')}")
+            # Create indexes if they don't exist; they are idempotent, so the caller's
+            # first queries go ahead while they are built and close() waits for them
+            self._index_task = asyncio.create_task(self._create_indexes())
             logger.info(f"Successfully connected to MongoDB and set up collections")
         except Exception as e:
             logger.error(f"Failed to connect to MongoDB: {e}")
+            await self.close()
             raise
     
+    async def __aenter__(self) -> "MongoClient":
+        """Connect on entering an ``async with`` block."""
+        await self.connect()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        """Close on leaving the block, even when it raised."""
+        await self.close()
+    
     async def _create_indexes(self) -> None:
         """Create necessary indexes for efficient querying."""
         try:
-            # Source collection indexes
-            await self.source_collection.create_index("status")
-            await self.source_collection.create_index("conversation_number")
-            await self.source_collection.create_index("last_processed_at")
-            
-            # Target collection indexes
-            await self.target_collection.create_index("conversation_number")
-            await self.target_collection.create_index("source_object_id")
-            await self.target_collection.create_index("processing_metadata.batch_job_id")
+            # Each create_index is a round-trip (a no-op when the index exists), so issue them together
+            await asyncio.gather(
+                # Source collection indexes
+                # Compound index serves the status filter and the _id-ordered pagination together
+                self.source_collection.create_index([("status", 1), ("_id", 1)]),
+                self.source_collection.create_index("conversation_number"),
+                # Serves find({"status": "processed"}).sort("last_processed_at", -1) without an in-memory sort
+                self.source_collection.create_index([("status", 1), ("last_processed_at", -1)]),
+                
+                # Target collection indexes
+                self.target_collection.create_index("conversation_number"),
+                # One result per source document per batch job: retried batches can't double-insert,
+                # and "already stored?" probes are a single index lookup. Partial, so result documents
+                # written without these fields aren't all treated as the same (null, null) key.
+                self.target_collection.create_index(
+                    [("source_object_id", 1), ("processing_metadata.batch_job_id", 1)],
+                    unique=True,
+                    partialFilterExpression={"source_object_id": {"$exists": True}}
+                ),
+                self.target_collection.create_index("processing_metadata.batch_job_id"),
+                # Newest/oldest-first result listings walk this index instead of sorting
+                self.target_collection.create_index([("processed_at", -1)])
+            )
             
             logger.info(f"Created MongoDB indexes for efficient querying")
         except Exception as e:
@@ -111,14 +164,21 @@ class MongoClient:
     async def fetch_unprocessed_documents(
         self, 
         batch_size: int = 100, 
-        last_object_id: Optional[str] = None
+        last_object_id: Optional[Union[ObjectId, str]] = None,
+        projection: Optional[Dict[str, Any]] = SOURCE_DOCUMENT_PROJECTION,
+        filter_criteria: Optional[Dict[str, Any]] = None
     ) -> List[Dict[str, Any]]:
         """
         Fetch a batch of unprocessed documents using ObjectId-based pagination.
         
         Args:
             batch_size: Maximum number of documents to fetch
-            last_object_id: ObjectId to start from (for pagination)
+            last_object_id: ObjectId to start from (for pagination); pass the previous page's
+                last document _id as-is to skip re-parsing its hex string
+            projection: Projection applied server-side to limit returned fields
+                (default: the fields a result document needs; None fetches whole documents)
+            filter_criteria: Extra conditions merged into the server-side query, e.g. to
+                restrict the batch to one tenant or test run
             
         Returns:
             List of unprocessed documents
@@ -127,30 +187,22 @@ class MongoClient:
             raise ValueError("Not connected to MongoDB")
         
         # Build the query filter: only fetch documents not marked as processed
-        query_filter = {"status": {"$ne": "processed"}}
+        query_filter = dict(UNPROCESSED_FILTER)
+        if filter_criteria:
+            query_filter.update(filter_criteria)
         # Add ObjectId pagination if provided
         if last_object_id:
-            from bson.objectid import ObjectId
-            query_filter["_id"] = {"$gt": ObjectId(last_object_id)}
+            if not isinstance(last_object_id, ObjectId):
+                last_object_id = ObjectId(last_object_id)
+            query_filter["_id"] = {"$gt": last_object_id}
         # Fetch documents with strict limit
-        cursor = self.source_collection.find(query_filter).limit(batch_size)
-        
-        documents = []
-        first_id = None
-        last_id = None
-        
-        # Enforce strict batch size limit
-        count = 0
-        
-        async for doc in cursor:
-            if count >= batch_size:
-                break
-                
-            if not first_id:
-                first_id = str(doc["_id"])
-            last_id = str(doc["_id"])
-            documents.append(doc)
-            count += 1
+        find_args = (query_filter, projection) if projection else (query_filter,)
+        # Walk _id in order so repeated calls page through the collection via the {status, _id} index.
+        # A cursor batch_size equal to the limit returns the whole page in the first reply.
+        cursor = self.source_collection.find(*find_args).sort("_id", 1).limit(batch_size).batch_size(batch_size)
+        documents = await cursor.to_list(length=batch_size)
+        first_id = str(documents[0]["_id"]) if documents else None
+        last_id = str(documents[-1]["_id"]) if documents else None
         
         logger.info(f"Fetched {len(documents)} unprocessed documents (batch size limit: {batch_size})")
         return documents, first_id, last_id
@@ -160,8 +212,10 @@ class MongoClient:
         self, 
         doc_id: str, 
         status: str = "processing", 
-        result_id: Optional[str] = None
-    ) -> None:
+        result_id: Optional[str] = None,
+        now: Optional[datetime] = None,
+        return_document: bool = False
+    ) -> Optional[Dict[str, Any]]:
         """
         Update the processing status of a document in the source collection.
         
@@ -169,78 +223,181 @@ class MongoClient:
             doc_id: Document ID to update
             status: New status value ("pending", "processing", "processed", "failed")
             result_id: ID of the result document in the target collection
+            now: Timestamp stored as last_processed_at (default: current UTC time)
+            return_document: Return the updated status and result_id from the same
+                round trip, so callers don't need to read the document back
+            
+        Returns:
+            The updated document's status and result_id when return_document is set
+            (None if no document matched), otherwise None
         """
         if self.source_collection is None:
             raise ValueError("Not connected to MongoDB")
         
-        from bson.objectid import ObjectId
-        
         update_data = {
             "status": status,
-            "last_processed_at": datetime.now(timezone.utc)
+            "last_processed_at": now or datetime.now(timezone.utc)
         }
         
         if result_id:
             update_data["result_id"] = result_id
         
-        await self.source_collection.update_one(
-            {"_id": ObjectId(doc_id)},
-            {"$set": update_data, "$inc": {"processing_attempts": 1}}
-        )
+        query = {"_id": ObjectId(doc_id)}
+        update = {"$set": update_data, "$inc": {"processing_attempts": 1}}
+        
+        if return_document:
+            updated = await self.source_collection.find_one_and_update(
+                query,
+                update,
+                projection={"status": 1, "result_id": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            logger.debug(f"Updated document {doc_id} status to {status}")
+            return updated
+        
+        await self.source_collection.update_one(query, update)
         
         logger.debug(f"Updated document {doc_id} status to {status}")
+        return None
     
-    @async_retry(max_retries=3, base_delay=1.0)
-    async def store_classification_result(
-        self, 
-        document: Dict[str, Any], 
+    async def update_document_statuses(
+        self,
+        updates: List[Dict[str, Any]],
+        now: Optional[datetime] = None
+    ) -> None:
+        """
+        Update the processing status of many documents in one unordered bulk write.
+        
+        Not retried here: a partially applied bulk write would increment
+        processing_attempts twice on retry, so callers handle BulkWriteError.
+        
+        Args:
+            updates: Dicts with "doc_id", "status" and an optional "result_id"
+            now: Timestamp stored as last_processed_at (default: current UTC time)
+        """
+        if self.source_collection is None:
+            raise ValueError("Not connected to MongoDB")
+        if not updates:
+            return
+        
+        now = now or datetime.now(timezone.utc)
+        operations = []
+        for update in updates:
+            update_data = {"status": update["status"], "last_processed_at": now}
+            if update.get("result_id"):
+                update_data["result_id"] = update["result_id"]
+            operations.append(UpdateOne(
+                {"_id": ObjectId(update["doc_id"])},
+                {"$set": update_data, "$inc": {"processing_attempts": 1}}
+            ))
+        
+        await self.source_collection.bulk_write(operations, ordered=False)
+        
+        logger.debug(f"Updated status of {len(operations)} documents")
+    
+    def build_result_document(
+        self,
+        document: Dict[str, Any],
         classification: Dict[str, Any],
         batch_job_id: str,
-        tweets: List[Dict] = None
-    ) -> str:
+        tweets: List[Dict] = None,
+        now: Optional[datetime] = None
+    ) -> Dict[str, Any]:
         """
-        Store classification result in the target collection.
+        Build the target-collection document for one classified source document.
         
         Args:
             document: Source document with the original conversation
             classification: Classification result
             batch_job_id: ID of the current batch job
             tweets: List of tweet objects from original document
+            now: Timestamp stored as processed_at; pass one per batch when building
+                many documents (default: current UTC time)
             
         Returns:
-            ID of the created document in the target collection
+            Result document ready to insert into the target collection
         """
-        if self.target_collection is None:
-            raise ValueError("Not connected to MongoDB")
-        
         # Extract conversation data
         conversation_number = document.get("conversation_number", str(document.get("_id")))
         source_id = str(document.get("_id"))
         
         # Create result document
-        result_doc = {
+        return {
             "conversation_number": conversation_number,
             "source_object_id": source_id,
             "classification": classification,
             "messages": None,  # Set to null as per the example
             "tweets": tweets or document.get("tweets", []),  # Use provided tweets or get from document
-            "processed_at": datetime.now(timezone.utc),
+            "processed_at": now or datetime.now(timezone.utc),
             "processing_metadata": {
                 "batch_job_id": batch_job_id,
                 "processing_attempts": document.get("processing_attempts", 0) + 1
             },
             "customer": document.get("customer")  # Added new global field, preserves all existing fields
         }
+    
+    @async_retry(max_retries=3, base_delay=1.0)
+    async def store_classification_result(
+        self, 
+        document: Dict[str, Any], 
+        classification: Dict[str, Any],
+        batch_job_id: str,
+        tweets: List[Dict] = None,
+        now: Optional[datetime] = None
+    ) -> str:
+        """
+        Store classification result in the target collection.
+        
+        Args:
+            document: Source document with the original conversation
+            classification: Classification result
+            batch_job_id: ID of the current batch job
+            tweets: List of tweet objects from original document
+            now: Timestamp stored as processed_at (default: current UTC time)
+            
+        Returns:
+            ID of the created document in the target collection
+        """
+        if self.target_collection is None:
+            raise ValueError("Not connected to MongoDB")
+        
+        result_doc = self.build_result_document(document, classification, batch_job_id, tweets, now)
         
         # Insert into target collection
         result = await self.target_collection.insert_one(result_doc)
         result_id = str(result.inserted_id)
         
-        logger.debug(f"Stored classification for document {source_id} with result_id {result_id}")
+        logger.debug(f"Stored classification for document {result_doc['source_object_id']} with result_id {result_id}")
         return result_id
     
+    async def store_classification_results(self, result_docs: List[Dict[str, Any]]) -> List[str]:
+        """
+        Store many classification results with one unordered insert_many.
+        
+        Not retried here: documents that were inserted before a failure would be
+        inserted again, so callers handle BulkWriteError.
+        
+        Args:
+            result_docs: Documents to insert into the target collection
+            
+        Returns:
+            IDs of the created documents, in input order
+        """
+        if self.target_collection is None:
+            raise ValueError("Not connected to MongoDB")
+        if not result_docs:
+            return []
+        
+        result = await self.target_collection.insert_many(result_docs, ordered=False)
+        
+        logger.debug(f"Stored {len(result.inserted_ids)} classification results")
+        return [str(inserted_id) for inserted_id in result.inserted_ids]
+    
     async def close(self) -> None:
         """Close the MongoDB connection."""
+        if self._index_task is not None:
+            await self._index_task
+            self._index_task = None
         if self.client:
             self.client.close()
             logger.info("MongoDB connection closed")
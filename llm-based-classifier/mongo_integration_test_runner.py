@@ -57,7 +57,7 @@ async def test_mongo_connection():
     
     # Connect to MongoDB
     print("Connecting to MongoDB")
-    await mongo_client.connect()
+    await mongo_client.connect(verify=True)
     
     # Test if connection was successful
     print("Checking connection")
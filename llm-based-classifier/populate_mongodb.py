@@ -2,6 +2,7 @@ import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 from datetime import datetime, timezone
 from bson import ObjectId
+from pymongo import UpdateOne
 import json
 import random
 
@@ -52,25 +53,33 @@ async def populate_mongodb():
         "Is there a discount for bulk orders?"
     ]
     
-    # Create 10 conversation documents
-    conversations = []
-    for i in range(10):
-        query = random.choice(customer_queries)
-        conversations.append({
-            "conversation_number": f"CONV-{datetime.now(timezone.utc).strftime('%Y%m%d')}-{i+1:03d}",
+    # One timestamp for the whole seed run instead of one per document
+    now = datetime.now(timezone.utc)
+    today = now.strftime('%Y%m%d')
+    
+    # Create 10 conversation documents, drawing all random fields up front
+    sample_count = 10
+    queries = random.choices(customer_queries, k=sample_count)
+    customer_numbers = random.choices(range(10000, 100000), k=sample_count)
+    priorities = random.choices(["low", "medium", "high"], k=sample_count)
+    conversations = [
+        {
+            "conversation_number": f"CONV-{today}-{i+1:03d}",
             "messages": [
                 {"role": "user", "content": query},
                 {"role": "agent", "content": "Thank you for reaching out. Let me help you with that."}
             ],
             "status": "pending",  # Options: pending, processing, processed
             "processing_attempts": 0,
-            "created_at": datetime.now(timezone.utc),
+            "created_at": now,
             "metadata": {
-                "customer_id": f"cust-{random.randint(10000, 99999)}",
+                "customer_id": f"cust-{customer_number}",
                 "source": "web_chat",
-                "priority": random.choice(["low", "medium", "high"])
+                "priority": priority
             }
-        })
+        }
+        for i, (query, customer_number, priority) in enumerate(zip(queries, customer_numbers, priorities))
+    ]
     
     # Insert the conversations
     result = await source_collection.insert_many(conversations)
@@ -78,10 +87,11 @@ async def populate_mongodb():
     print(f"Inserted {len(inserted_ids)} sample conversations")
     
     # Process a couple to show the workflow
-    for i, doc_id in enumerate(inserted_ids[:3]):
-        # Update status to processed for the first few documents
-        doc = await source_collection.find_one({"_id": doc_id})
-        
+    # The inserted documents are still in `conversations`, so nothing is read back;
+    # results go in with one insert_many and the source updates with one bulk_write
+    processed = list(zip(inserted_ids[:3], conversations[:3]))
+    result_docs = []
+    for doc_id, doc in processed:
         # Create a classification result
         classification = {
             "intent": random.choice(["inquiry", "complaint", "request"]),
@@ -90,32 +100,35 @@ async def populate_mongodb():
             "priority": random.choice(["low", "medium", "high"])
         }
         
-        # Insert the classification result
-        result_doc = {
+        # Build the classification result
+        result_docs.append({
             "conversation_number": doc["conversation_number"],
-            "source_object_id": str(doc["_id"]),
+            "source_object_id": str(doc_id),
             "classification": classification,
             "original_messages": doc["messages"],
-            "processed_at": datetime.now(timezone.utc),
+            "processed_at": now,
             "processing_metadata": {
-                "batch_job_id": f"sample-batch-{datetime.now(timezone.utc).strftime('%Y%m%d')}",
+                "batch_job_id": f"sample-batch-{today}",
                 "processing_attempts": 1
             }
-        }
-        
-        # Store in target collection
-        result = await db[target_collection_name].insert_one(result_doc)
-        result_id = str(result.inserted_id)
-        
-        # Update the source document
-        await source_collection.update_one(
+        })
+    
+    # Store in target collection
+    result = await db[target_collection_name].insert_many(result_docs, ordered=False)
+    
+    # Update the source documents
+    await source_collection.bulk_write([
+        UpdateOne(
             {"_id": doc_id},
             {"$set": {
                 "status": "processed",
-                "last_processed_at": datetime.now(timezone.utc),
-                "result_id": result_id
+                "last_processed_at": now,
+                "result_id": str(result_id)
             }}
         )
+        for (doc_id, _), result_id in zip(processed, result.inserted_ids)
+    ], ordered=False)
+    for i, (_, doc) in enumerate(processed):
         print(f"Processed document {i+1}: {doc['conversation_number']}")
     
     # Verify final state
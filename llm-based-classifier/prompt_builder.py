@@ -3,14 +3,14 @@ import json
 import os
 print(f"[DEBUG] Loaded prompt_builder.py from: {os.path.abspath(__file__)}")
 
-# Allowed values for schema fields
-INTENT_OPTIONS = [
+# Allowed values for schema fields; frozensets so validating a classification is a hash lookup
+INTENT_OPTIONS = frozenset({
     "Order Status", "Cancel Order", "Return/Refund", "Product Inquiry", "Technical Support", "Complaint", "Feedback", "Account/Billing", "Shipping", "Shipping/Delivery", "Other"
-]
-TOPIC_OPTIONS = [
+})
+TOPIC_OPTIONS = frozenset({
     "Orders", "Payments", "Shipping/Delivery", "Shipping", "Returns", "Refunds", "Warranty", "Product Info", "Account", "Technical", "General"
-]
-SENTIMENT_OPTIONS = ["Positive", "Neutral", "Negative"]
+})
+SENTIMENT_OPTIONS = frozenset({"Positive", "Neutral", "Negative"})
 
 # Multi-turn few-shot examples (list of messages per example)
 FEW_SHOTS = [
@@ -40,6 +40,46 @@ FEW_SHOTS = [
     }
 ]
 
+SYSTEM_PROMPT = (
+    'You are a customer-support classifier. Return EXACTLY this JSON structure:\n'
+    '{\n'
+    '  "categorization": "brief text description",\n'
+    '  "intent": "one of the allowed intents",\n'
+    '  "topic": "one of the allowed topics",\n'
+    '  "sentiment": "Positive/Neutral/Negative"\n'
+    '}\n\n'
+    'CRITICAL: Use DOUBLE QUOTES for ALL strings. Example:\n'
+    '{"categorization": "Order delay issue", "intent": "Order Status", "topic": "Shipping", "sentiment": "Negative"}\n\n'
+    'Allowed intents: "Order Status", "Cancel Order", "Return/Refund", "Product Inquiry",\n'
+    '"Technical Support", "Complaint", "Feedback", "Account/Billing", "Shipping", "Other"\n\n'
+    'Allowed topics: "Orders", "Payments", "Shipping/Delivery", "Returns", "Refunds",\n'
+    '"Warranty", "Product Info", "Account", "Technical", "General"'
+)
+
+def _build_prefix_messages():
+    """
+    Builds the system prompt and few-shot turns shared by every prompt.
+    Called once at import; none of it depends on the conversation.
+    """
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT}
+    ]
+    # Add few-shot examples as multi-turn user/assistant pairs
+    for ex in FEW_SHOTS:
+        # Combine all customer/agent messages into a single string for the user turn
+        user_msgs = []
+        for msg in ex["messages"]:
+            if msg["sender"] == "customer":
+                user_msgs.append(f"Customer: {msg['text']}")
+            elif msg["sender"] == "agent":
+                user_msgs.append(f"Agent: {msg['text']}")
+        user_content = "\n".join(user_msgs)
+        messages.append({"role": "user", "content": user_content})
+        messages.append({"role": "assistant", "content": json.dumps(ex["output"], ensure_ascii=False)})
+    return messages
+
+_PREFIX_MESSAGES = _build_prefix_messages()
+
 def build_prompt(conversation_number, aggregated_text):
     """
     Constructs the prompt for LLM classification.
@@ -49,39 +89,8 @@ def build_prompt(conversation_number, aggregated_text):
     try:
         if not conversation_number or not aggregated_text:
             return {"error": "Invalid input: conversation_number and aggregated_text are required"}
-        SYSTEM_PROMPT = (
-            'You are a customer-support classifier. Return EXACTLY this JSON structure:\n'
-            '{\n'
-            '  "categorization": "brief text description",\n'
-            '  "intent": "one of the allowed intents",\n'
-            '  "topic": "one of the allowed topics",\n'
-            '  "sentiment": "Positive/Neutral/Negative"\n'
-            '}\n\n'
-            'CRITICAL: Use DOUBLE QUOTES for ALL strings. Example:\n'
-            '{"categorization": "Order delay issue", "intent": "Order Status", "topic": "Shipping", "sentiment": "Negative"}\n\n'
-            'Allowed intents: "Order Status", "Cancel Order", "Return/Refund", "Product Inquiry",\n'
-            '"Technical Support", "Complaint", "Feedback", "Account/Billing", "Shipping", "Other"\n\n'
-            'Allowed topics: "Orders", "Payments", "Shipping/Delivery", "Returns", "Refunds",\n'
-            '"Warranty", "Product Info", "Account", "Technical", "General"'
-        )
-        messages = [
-            {"role": "system", "content": SYSTEM_PROMPT}
-        ]
-        # Add few-shot examples as multi-turn user/assistant pairs
-        for ex in FEW_SHOTS:
-            # Combine all customer/agent messages into a single string for the user turn
-            user_msgs = []
-            for msg in ex["messages"]:
-                if msg["sender"] == "customer":
-                    user_msgs.append(f"Customer: {msg['text']}")
-                elif msg["sender"] == "agent":
-                    user_msgs.append(f"Agent: {msg['text']}")
-            user_content = "\n".join(user_msgs)
-            messages.append({"role": "user", "content": user_content})
-            messages.append({"role": "assistant", "content": json.dumps(ex["output"], ensure_ascii=False)})
-        # Add actual conversation
+        # Add actual conversation after the prebuilt system prompt and few-shot turns
         user_query = f"Customer Query:\n{aggregated_text}\nReturn ONLY JSON:"
-        messages.append({"role": "user", "content": user_query})
-        return {"messages": messages}
+        return {"messages": _PREFIX_MESSAGES + [{"role": "user", "content": user_query}]}
     except Exception as e:
         return {"error": f"Prompt construction error: {str(e)}"}
@@ -4,7 +4,6 @@ Script to run the batch processor using environment variables from .env file.
 """
 import os
 import sys
-import subprocess
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -18,18 +17,21 @@ print(f"Using OLLAMA_ENDPOINT from .env: {os.environ.get('OLLAMA_ENDPOINT', 'Not
 # This will make the batch processor exit after processing one batch
 os.environ["BATCH_PROCESSOR_FORCE_EXIT_AFTER_BATCH"] = "true"
 
-# Get command line arguments, use sys.argv[1:] to pass through any arguments provided
-cmd = [sys.executable, "batch_processor.py"] + sys.argv[1:]
+# Pass through any arguments provided
+argv = sys.argv[1:]
 
 # If no arguments provided, use defaults
-if len(sys.argv) == 1:
-    cmd.extend([
+if not argv:
+    argv = [
         "--batch-size", "10",     # Default to 10 documents
         "--concurrent", "5",      # Default concurrency of 5
         "--mode", "batch",        # Default to batch mode
         "--checkpoint-interval", "10"  # Default checkpoint interval
-    ])
+    ]
 
-print(f"Running: {' '.join(cmd)}")
+# Run in this process rather than a child interpreter; .env is already loaded
+import batch_processor
+
+print(f"Running: batch_processor.py {' '.join(argv)}")
 print("This will process exactly one batch with the specified parameters.")
-subprocess.run(cmd)
\ No newline at end of file
+batch_processor.run_main(argv)
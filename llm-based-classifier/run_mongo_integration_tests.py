@@ -8,7 +8,7 @@ import os
 import random
 from datetime import datetime, timezone
 from bson.objectid import ObjectId
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, WriteConcern
 
 from mongo_client import MongoClient
 from tests.integration_config import (
@@ -23,29 +23,36 @@ from tests.integration_config import (
 # Create a unique ID for this test run to avoid conflicts if multiple tests run simultaneously
 TEST_RUN_ID = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
 
-async def setup_test_db():
+async def setup_test_db(client):
     """
     Set up the test MongoDB collections.
     Creates collections if they don't exist and clears any existing data.
+    
+    Args:
+        client: AsyncIOMotorClient instance
     """
-    print(f"Connecting to {MONGODB_TEST_URI}")
-    client = AsyncIOMotorClient(MONGODB_TEST_URI, **MONGODB_TEST_PARAMS)
     db = client[MONGODB_TEST_DB]
     
-    # Clear any existing data
-    await db[MONGODB_TEST_SOURCE_COLLECTION].delete_many({"test_run_id": TEST_RUN_ID})
-    await db[MONGODB_TEST_TARGET_COLLECTION].delete_many({"test_run_id": TEST_RUN_ID})
+    # Clear any existing data; the collections are independent so both deletes run at once
+    await asyncio.gather(
+        db[MONGODB_TEST_SOURCE_COLLECTION].delete_many({"test_run_id": TEST_RUN_ID}),
+        db[MONGODB_TEST_TARGET_COLLECTION].delete_many({"test_run_id": TEST_RUN_ID})
+    )
     
-    # Create indexes
-    await db[MONGODB_TEST_SOURCE_COLLECTION].create_index("status")
-    await db[MONGODB_TEST_SOURCE_COLLECTION].create_index("conversation_number")
-    await db[MONGODB_TEST_SOURCE_COLLECTION].create_index("test_run_id")
-    await db[MONGODB_TEST_TARGET_COLLECTION].create_index("test_run_id")
+    # Create indexes, one createIndexes command per collection
+    await asyncio.gather(
+        db[MONGODB_TEST_SOURCE_COLLECTION].create_indexes([
+            IndexModel("status"),
+            IndexModel("conversation_number"),
+            # Prefix serves the per-run cleanup; the full key serves per-test queries
+            IndexModel([("test_run_id", 1), ("test_name", 1)])
+        ]),
+        db[MONGODB_TEST_TARGET_COLLECTION].create_indexes([IndexModel("test_run_id")])
+    )
     
-    client.close()
     return True
 
-async def insert_test_documents(client, count=10, status="pending"):
+async def insert_test_documents(client, count=10, status="pending", test_name="default"):
     """
     Insert test documents into the source collection.
     
@@ -53,103 +60,81 @@ async def insert_test_documents(client, count=10, status="pending"):
         client: AsyncIOMotorClient instance
         count: Number of test documents to insert
         status: Status to set for the documents ('pending', 'processing', 'processed')
+        test_name: Name of the calling test, stored on each document and in its conversation
+            number so tests running at the same time can tell their documents apart
         
     Returns:
-        List of inserted document IDs
+        List of inserted documents; insert_many fills in each "_id" in place
     """
     db = client[MONGODB_TEST_DB]
     
-    documents = []
-    for i in range(count):
-        doc = {
-            "conversation_number": f"TEST-CONV-{TEST_RUN_ID}-{i}",
+    # One timestamp for the batch instead of one per document
+    now = datetime.now(timezone.utc)
+    documents = [
+        {
+            "conversation_number": f"TEST-CONV-{TEST_RUN_ID}-{test_name}-{i}",
             "messages": [
                 {"role": "user", "content": f"This is test message {i} from user"},
                 {"role": "agent", "content": f"This is test response {i} from agent"}
             ],
             "status": status,
             "processing_attempts": 0,
-            "created_at": datetime.now(timezone.utc),
+            "created_at": now,
             "test_run_id": TEST_RUN_ID,
+            "test_name": test_name,
             "metadata": {
                 "test": True,
                 "customer_id": f"test-customer-{i}",
                 "source": "integration_test"
             }
         }
-        documents.append(doc)
+        for i in range(count)
+    ]
     
-    result = await db[MONGODB_TEST_SOURCE_COLLECTION].insert_many(documents)
+    # Throwaway seed data: no dependencies between documents and no need to wait for
+    # replication, so insert unordered and acknowledge from the primary only
+    source = db[MONGODB_TEST_SOURCE_COLLECTION].with_options(write_concern=WriteConcern(w=1))
+    await source.insert_many(documents, ordered=False)
     
-    return [str(id) for id in result.inserted_ids]
+    return documents
 
-async def teardown_test_db():
+async def teardown_test_db(client):
     """
     Clean up the test MongoDB collections.
     Removes all test data created by this run.
+    
+    Args:
+        client: AsyncIOMotorClient instance
     """
-    client = AsyncIOMotorClient(MONGODB_TEST_URI, **MONGODB_TEST_PARAMS)
     db = client[MONGODB_TEST_DB]
     
     # Remove all test data for this run
-    await db[MONGODB_TEST_SOURCE_COLLECTION].delete_many({"test_run_id": TEST_RUN_ID})
-    await db[MONGODB_TEST_TARGET_COLLECTION].delete_many({"test_run_id": TEST_RUN_ID})
+    await asyncio.gather(
+        db[MONGODB_TEST_SOURCE_COLLECTION].delete_many({"test_run_id": TEST_RUN_ID}),
+        db[MONGODB_TEST_TARGET_COLLECTION].delete_many({"test_run_id": TEST_RUN_ID})
+    )
     
-    client.close()
     return True
 
-async def test_connect_to_mongodb():
+async def test_connect_to_mongodb(mongo_client):
     """Test connecting to MongoDB and validating connection."""
     print("\n=== Running test_connect_to_mongodb ===")
     
-    # Create MongoDB client
-    mongo_client = MongoClient(
-        mongodb_uri=MONGODB_TEST_URI,
-        db_name=MONGODB_TEST_DB,
-        source_collection=MONGODB_TEST_SOURCE_COLLECTION,
-        target_collection=MONGODB_TEST_TARGET_COLLECTION,
-        max_pool_size=MONGODB_TEST_PARAMS["maxPoolSize"],
-        min_pool_size=MONGODB_TEST_PARAMS["minPoolSize"],
-        max_idle_time_ms=MONGODB_TEST_PARAMS["maxIdleTimeMS"],
-        connect_timeout_ms=MONGODB_TEST_PARAMS["connectTimeoutMS"],
-        server_selection_timeout_ms=MONGODB_TEST_PARAMS["serverSelectionTimeoutMS"]
-    )
-    
-    # Connect to MongoDB
-    await mongo_client.connect()
-    
     # Test if connection was successful
     assert mongo_client.client is not None, "Client is None"
     assert mongo_client.db is not None, "DB is None"
     assert mongo_client.source_collection is not None, "Source collection is None"
     assert mongo_client.target_collection is not None, "Target collection is None"
     
-    await mongo_client.close()
     print("✅ Test passed!")
     return True
 
-async def test_fetch_unprocessed_documents():
+async def test_fetch_unprocessed_documents(mongo_client):
     """Test fetching unprocessed documents from MongoDB."""
     print("\n=== Running test_fetch_unprocessed_documents ===")
     
-    # Create MongoDB client
-    mongo_client = MongoClient(
-        mongodb_uri=MONGODB_TEST_URI,
-        db_name=MONGODB_TEST_DB,
-        source_collection=MONGODB_TEST_SOURCE_COLLECTION,
-        target_collection=MONGODB_TEST_TARGET_COLLECTION,
-        max_pool_size=MONGODB_TEST_PARAMS["maxPoolSize"],
-        min_pool_size=MONGODB_TEST_PARAMS["minPoolSize"],
-        max_idle_time_ms=MONGODB_TEST_PARAMS["maxIdleTimeMS"],
-        connect_timeout_ms=MONGODB_TEST_PARAMS["connectTimeoutMS"],
-        server_selection_timeout_ms=MONGODB_TEST_PARAMS["serverSelectionTimeoutMS"]
-    )
-    
-    # Connect to MongoDB
-    await mongo_client.connect()
-    
     # Insert test documents with "pending" status
-    doc_ids = await insert_test_documents(mongo_client.client, count=5, status="pending")
+    await insert_test_documents(mongo_client.client, count=5, status="pending", test_name="test_fetch_unprocessed_documents")
     
     # Fetch unprocessed documents
     documents, first_id, last_id = await mongo_client.fetch_unprocessed_documents(batch_size=TEST_BATCH_SIZE)
@@ -160,86 +145,39 @@ async def test_fetch_unprocessed_documents():
     assert last_id is not None, "Last ID is None"
     assert all(doc["status"] != "processed" for doc in documents), "Found processed documents"
     
-    await mongo_client.close()
     print("✅ Test passed!")
     return True
 
-async def test_update_document_status():
+async def test_update_document_status(mongo_client):
     """Test updating document status in MongoDB."""
     print("\n=== Running test_update_document_status ===")
     
-    # Create MongoDB client
-    mongo_client = MongoClient(
-        mongodb_uri=MONGODB_TEST_URI,
-        db_name=MONGODB_TEST_DB,
-        source_collection=MONGODB_TEST_SOURCE_COLLECTION,
-        target_collection=MONGODB_TEST_TARGET_COLLECTION,
-        max_pool_size=MONGODB_TEST_PARAMS["maxPoolSize"],
-        min_pool_size=MONGODB_TEST_PARAMS["minPoolSize"],
-        max_idle_time_ms=MONGODB_TEST_PARAMS["maxIdleTimeMS"],
-        connect_timeout_ms=MONGODB_TEST_PARAMS["connectTimeoutMS"],
-        server_selection_timeout_ms=MONGODB_TEST_PARAMS["serverSelectionTimeoutMS"]
-    )
-    
-    # Connect to MongoDB
-    await mongo_client.connect()
-    
     # Insert a test document
-    doc_ids = await insert_test_documents(mongo_client.client, count=1, status="pending")
-    doc_id = doc_ids[0]
+    documents = await insert_test_documents(mongo_client.client, count=1, status="pending", test_name="test_update_document_status")
+    doc_id = str(documents[0]["_id"])
     
-    # Update the document status
-    await mongo_client.update_document_status(doc_id, "processing")
-    
-    # Verify the status was updated
-    client = mongo_client.client
-    db = client[MONGODB_TEST_DB]
-    doc = await db[MONGODB_TEST_SOURCE_COLLECTION].find_one({"_id": ObjectId(doc_id)})
+    # Update the document status; the post-image comes back with the write
+    doc = await mongo_client.update_document_status(doc_id, "processing", return_document=True)
     
     assert doc["status"] == "processing", f"Expected status 'processing', got '{doc['status']}'"
     
     # Update with result ID
     result_id = "test-result-id-12345"
-    await mongo_client.update_document_status(doc_id, "processed", result_id)
-    
-    # Get the document directly to verify the result_id
-    doc = await db[MONGODB_TEST_SOURCE_COLLECTION].find_one({"_id": ObjectId(doc_id)})
+    doc = await mongo_client.update_document_status(doc_id, "processed", result_id, return_document=True)
     
     assert doc["status"] == "processed", f"Expected status 'processed', got '{doc['status']}'"
     assert doc["result_id"] == result_id, f"Expected result_id '{result_id}', got '{doc.get('result_id')}'"
     
-    await mongo_client.close()
     print("✅ Test passed!")
     return True
 
-async def test_store_classification_result():
+async def test_store_classification_result(mongo_client):
     """Test storing classification results in MongoDB."""
     print("\n=== Running test_store_classification_result ===")
     
-    # Create MongoDB client
-    mongo_client = MongoClient(
-        mongodb_uri=MONGODB_TEST_URI,
-        db_name=MONGODB_TEST_DB,
-        source_collection=MONGODB_TEST_SOURCE_COLLECTION,
-        target_collection=MONGODB_TEST_TARGET_COLLECTION,
-        max_pool_size=MONGODB_TEST_PARAMS["maxPoolSize"],
-        min_pool_size=MONGODB_TEST_PARAMS["minPoolSize"],
-        max_idle_time_ms=MONGODB_TEST_PARAMS["maxIdleTimeMS"],
-        connect_timeout_ms=MONGODB_TEST_PARAMS["connectTimeoutMS"],
-        server_selection_timeout_ms=MONGODB_TEST_PARAMS["serverSelectionTimeoutMS"]
-    )
-    
-    # Connect to MongoDB
-    await mongo_client.connect()
-    
-    # Insert a test document
-    doc_ids = await insert_test_documents(mongo_client.client, count=1, status="processing")
-    doc_id = doc_ids[0]
-    
-    # Get the document to use for classification
-    client = mongo_client.client
-    db = client[MONGODB_TEST_DB]
-    doc = await db[MONGODB_TEST_SOURCE_COLLECTION].find_one({"_id": ObjectId(doc_id)})
+    # Insert a test document and use it for classification as-is, no read back needed
+    documents = await insert_test_documents(mongo_client.client, count=1, status="processing", test_name="test_store_classification_result")
+    doc = documents[0]
     
     # Create a classification result
     classification = {
@@ -265,6 +203,7 @@ async def test_store_classification_result():
     result_id = await mongo_client.store_classification_result(doc, classification, batch_job_id, tweets)
     
     # Verify the result was stored
+    db = mongo_client.client[MONGODB_TEST_DB]
     result_doc = await db[MONGODB_TEST_TARGET_COLLECTION].find_one({"_id": ObjectId(result_id)})
     
     assert result_doc is not None, "Result document not found"
@@ -272,59 +211,40 @@ async def test_store_classification_result():
     assert result_doc["source_object_id"] == str(doc["_id"]), "Source object ID doesn't match"
     assert result_doc["processing_metadata"]["batch_job_id"] == batch_job_id, "Batch job ID doesn't match"
     
-    await mongo_client.close()
     print("✅ Test passed!")
     return True
 
-async def test_pagination_with_last_object_id():
+async def test_pagination_with_last_object_id(mongo_client):
     """Test pagination using last_object_id parameter."""
     print("\n=== Running test_pagination_with_last_object_id ===")
     
-    # Create MongoDB client
-    mongo_client = MongoClient(
-        mongodb_uri=MONGODB_TEST_URI,
-        db_name=MONGODB_TEST_DB,
-        source_collection=MONGODB_TEST_SOURCE_COLLECTION,
-        target_collection=MONGODB_TEST_TARGET_COLLECTION,
-        max_pool_size=MONGODB_TEST_PARAMS["maxPoolSize"],
-        min_pool_size=MONGODB_TEST_PARAMS["minPoolSize"],
-        max_idle_time_ms=MONGODB_TEST_PARAMS["maxIdleTimeMS"],
-        connect_timeout_ms=MONGODB_TEST_PARAMS["connectTimeoutMS"],
-        server_selection_timeout_ms=MONGODB_TEST_PARAMS["serverSelectionTimeoutMS"]
-    )
-    
-    # Connect to MongoDB
-    await mongo_client.connect()
-    
     # Insert more test documents than our batch size
     total_docs = TEST_BATCH_SIZE * 2 + 1  # Ensure we need more than 2 pages
-    doc_ids = await insert_test_documents(mongo_client.client, count=total_docs, status="pending")
-    
-    # Fetch the first batch
-    batch1, first_id, last_id1 = await mongo_client.fetch_unprocessed_documents(batch_size=TEST_BATCH_SIZE)
-    
-    # Filter only documents from this test run
-    batch1 = [doc for doc in batch1 if doc.get("test_run_id") == TEST_RUN_ID]
+    documents = await insert_test_documents(mongo_client.client, count=total_docs, status="pending", test_name="test_pagination_with_last_object_id")
+    
+    # Fetch the first batch; only this test's documents are matched server-side, since the
+    # other tests run concurrently under the same TEST_RUN_ID
+    run_filter = {"test_run_id": TEST_RUN_ID, "test_name": "test_pagination_with_last_object_id"}
+    batch1, first_id, last_id1 = await mongo_client.fetch_unprocessed_documents(
+        batch_size=TEST_BATCH_SIZE,
+        filter_criteria=run_filter
+    )
     assert len(batch1) <= TEST_BATCH_SIZE, f"Expected at most {TEST_BATCH_SIZE} documents, got {len(batch1)}"
     
     # Fetch the second batch using last_object_id from first batch
     batch2, _, last_id2 = await mongo_client.fetch_unprocessed_documents(
         batch_size=TEST_BATCH_SIZE, 
-        last_object_id=last_id1
+        last_object_id=last_id1,
+        filter_criteria=run_filter
     )
     
-    # Filter only documents from this test run
-    batch2 = [doc for doc in batch2 if doc.get("test_run_id") == TEST_RUN_ID]
-    
     # Fetch the third batch
     batch3, _, _ = await mongo_client.fetch_unprocessed_documents(
         batch_size=TEST_BATCH_SIZE, 
-        last_object_id=last_id2
+        last_object_id=last_id2,
+        filter_criteria=run_filter
     )
     
-    # Filter only documents from this test run
-    batch3 = [doc for doc in batch3 if doc.get("test_run_id") == TEST_RUN_ID]
-    
     # Make sure the batches are different
     batch1_ids = [str(doc["_id"]) for doc in batch1]
     batch2_ids = [str(doc["_id"]) for doc in batch2]
@@ -335,7 +255,12 @@ async def test_pagination_with_last_object_id():
     assert len(set(batch2_ids).intersection(set(batch3_ids))) == 0, "Batches 2 and 3 have overlapping IDs"
     assert len(set(batch1_ids).intersection(set(batch3_ids))) == 0, "Batches 1 and 3 have overlapping IDs"
     
-    await mongo_client.close()
+    # Together the three pages cover exactly the documents this test inserted
+    paged_ids = batch1_ids + batch2_ids + batch3_ids
+    inserted_ids = {str(doc["_id"]) for doc in documents}
+    assert len(paged_ids) == total_docs, f"Expected {total_docs} paged documents, got {len(paged_ids)}"
+    assert set(paged_ids) == inserted_ids, "Pages don't match the inserted documents"
+    
     print("✅ Test passed!")
     return True
 
@@ -343,10 +268,25 @@ async def run_tests():
     """Run all MongoDB integration tests."""
     print(f"=== Starting MongoDB Integration Tests (Run ID: {TEST_RUN_ID}) ===")
     
-    # Setup test database and collections
-    await setup_test_db()
+    # One connected client for the whole suite so the run pays for a single handshake
+    print(f"Connecting to {MONGODB_TEST_URI}")
+    mongo_client = MongoClient(
+        mongodb_uri=MONGODB_TEST_URI,
+        db_name=MONGODB_TEST_DB,
+        source_collection=MONGODB_TEST_SOURCE_COLLECTION,
+        target_collection=MONGODB_TEST_TARGET_COLLECTION,
+        max_pool_size=MONGODB_TEST_PARAMS["maxPoolSize"],
+        min_pool_size=MONGODB_TEST_PARAMS["minPoolSize"],
+        max_idle_time_ms=MONGODB_TEST_PARAMS["maxIdleTimeMS"],
+        connect_timeout_ms=MONGODB_TEST_PARAMS["connectTimeoutMS"],
+        server_selection_timeout_ms=MONGODB_TEST_PARAMS["serverSelectionTimeoutMS"]
+    )
+    await mongo_client.connect(verify=True)
     
     try:
+        # Setup test database and collections
+        await setup_test_db(mongo_client.client)
+        
         # Run tests
         tests = [
             test_connect_to_mongodb,
@@ -356,13 +296,15 @@ async def run_tests():
             test_pagination_with_last_object_id
         ]
         
+        # Each test inserts its own documents, so they can share the pool concurrently
+        outcomes = await asyncio.gather(*(test(mongo_client) for test in tests), return_exceptions=True)
+        
         results = []
-        for test in tests:
-            try:
-                result = await test()
-                results.append((test.__name__, result, None))
-            except Exception as e:
-                results.append((test.__name__, False, str(e)))
+        for test, outcome in zip(tests, outcomes):
+            if isinstance(outcome, BaseException):
+                results.append((test.__name__, False, str(outcome)))
+            else:
+                results.append((test.__name__, outcome, None))
         
         # Print summary
         print("\n=== Test Results ===")
@@ -381,7 +323,10 @@ async def run_tests():
     
     finally:
         # Clean up
-        await teardown_test_db()
+        try:
+            await teardown_test_db(mongo_client.client)
+        finally:
+            await mongo_client.close()
 
 if __name__ == "__main__":
     asyncio.run(run_tests())
\ No newline at end of file
@@ -33,7 +33,7 @@ async def test_mongo_fetch():
     try:
         # Connect to MongoDB
         print("Connecting to MongoDB...")
-        await mongo_client.connect()
+        await mongo_client.connect(verify=True)
         print("Connected successfully")
         
         # Fetch a small batch of documents
@@ -12,8 +12,8 @@ MONGODB_TEST_TARGET_COLLECTION = "sentimental_analysis_test"
 
 # Connection parameters for testing
 MONGODB_TEST_PARAMS = {
-    "maxPoolSize": 10,
-    "minPoolSize": 1,
+    "maxPoolSize": 50,
+    "minPoolSize": 10,  # Keep connections warm for the concurrently running tests
     "maxIdleTimeMS": 30000,
     "connectTimeoutMS": 5000,
     "serverSelectionTimeoutMS": 5000,
@@ -9,6 +9,7 @@ import json
 from datetime import datetime, timezone
 from bson.objectid import ObjectId
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import IndexModel, WriteConcern
 from tests.integration_config import (
     MONGODB_TEST_URI,
     MONGODB_TEST_DB,
@@ -17,63 +18,104 @@ from tests.integration_config import (
     MONGODB_TEST_PARAMS
 )
 
-async def setup_test_db():
+# One client per event loop; Motor clients are bound to the loop they were created on
+_clients = {}
+
+async def _get_client():
+    """
+    Get the shared test client for the running event loop.
+    Creates it on first use so every helper reuses one connection pool.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = AsyncIOMotorClient(MONGODB_TEST_URI, **MONGODB_TEST_PARAMS)
+        _clients[loop] = client
+    return client
+
+async def close_client():
+    """
+    Close the shared test client for the running event loop, if one was created.
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        client.close()
+
+async def setup_test_db(client=None):
     """
     Set up the test MongoDB collections.
     Creates collections if they don't exist and clears any existing data.
+    
+    Args:
+        client: AsyncIOMotorClient to use (defaults to the shared test client)
     """
-    client = AsyncIOMotorClient(MONGODB_TEST_URI, **MONGODB_TEST_PARAMS)
+    if client is None:
+        client = await _get_client()
     db = client[MONGODB_TEST_DB]
     
     # Create collections if they don't exist (MongoDB creates them on first insert)
-    # Clear any existing data
-    await db[MONGODB_TEST_SOURCE_COLLECTION].delete_many({})
-    await db[MONGODB_TEST_TARGET_COLLECTION].delete_many({})
+    # Clear any existing data; the collections are independent so both deletes run at once
+    await asyncio.gather(
+        db[MONGODB_TEST_SOURCE_COLLECTION].delete_many({}),
+        db[MONGODB_TEST_TARGET_COLLECTION].delete_many({})
+    )
     
-    # Create indexes
-    await db[MONGODB_TEST_SOURCE_COLLECTION].create_index("status")
-    await db[MONGODB_TEST_SOURCE_COLLECTION].create_index("conversation_number")
-    await db[MONGODB_TEST_SOURCE_COLLECTION].create_index("last_processed_at")
+    # Create indexes, one createIndexes command per collection
+    await asyncio.gather(
+        db[MONGODB_TEST_SOURCE_COLLECTION].create_indexes([
+            IndexModel("status"),
+            IndexModel("conversation_number"),
+            IndexModel("last_processed_at")
+        ]),
+        db[MONGODB_TEST_TARGET_COLLECTION].create_indexes([
+            IndexModel("conversation_number"),
+            IndexModel("source_object_id"),
+            IndexModel("processing_metadata.batch_job_id")
+        ])
+    )
     
-    await db[MONGODB_TEST_TARGET_COLLECTION].create_index("conversation_number")
-    await db[MONGODB_TEST_TARGET_COLLECTION].create_index("source_object_id")
-    await db[MONGODB_TEST_TARGET_COLLECTION].create_index("processing_metadata.batch_job_id")
-    
-    client.close()
     return True
 
-async def teardown_test_db():
+async def teardown_test_db(client=None):
     """
     Clean up the test MongoDB collections.
     Removes all test data to leave the environment clean.
+    
+    Args:
+        client: AsyncIOMotorClient to use (defaults to the shared test client)
     """
-    client = AsyncIOMotorClient(MONGODB_TEST_URI, **MONGODB_TEST_PARAMS)
+    if client is None:
+        client = await _get_client()
     db = client[MONGODB_TEST_DB]
     
     # Remove all test data
-    await db[MONGODB_TEST_SOURCE_COLLECTION].delete_many({})
-    await db[MONGODB_TEST_TARGET_COLLECTION].delete_many({})
+    await asyncio.gather(
+        db[MONGODB_TEST_SOURCE_COLLECTION].delete_many({}),
+        db[MONGODB_TEST_TARGET_COLLECTION].delete_many({})
+    )
     
-    client.close()
     return True
 
-async def insert_test_documents(count=10, status="pending"):
+async def insert_test_documents(count=10, status="pending", client=None):
     """
     Insert test documents into the source collection.
     
     Args:
         count: Number of test documents to insert
         status: Status to set for the documents ('pending', 'processing', 'processed')
+        client: AsyncIOMotorClient to use (defaults to the shared test client)
         
     Returns:
         List of inserted document IDs
     """
-    client = AsyncIOMotorClient(MONGODB_TEST_URI, **MONGODB_TEST_PARAMS)
+    if client is None:
+        client = await _get_client()
     db = client[MONGODB_TEST_DB]
     
-    documents = []
-    for i in range(count):
-        doc = {
+    # One timestamp for the batch instead of one per document
+    now = datetime.now(timezone.utc)
+    documents = [
+        {
             "conversation_number": f"TEST-CONV-{i}",
             "messages": [
                 {"role": "user", "content": f"This is test message {i} from user"},
@@ -81,53 +123,59 @@ async def insert_test_documents(count=10, status="pending"):
             ],
             "status": status,
             "processing_attempts": 0,
-            "created_at": datetime.now(timezone.utc),
+            "created_at": now,
             "metadata": {
                 "test": True,
                 "customer_id": f"test-customer-{i}",
                 "source": "integration_test"
             }
         }
-        documents.append(doc)
+        for i in range(count)
+    ]
     
-    result = await db[MONGODB_TEST_SOURCE_COLLECTION].insert_many(documents)
-    client.close()
+    # Throwaway seed data: no dependencies between documents and no need to wait for
+    # replication, so insert unordered and acknowledge from the primary only
+    source = db[MONGODB_TEST_SOURCE_COLLECTION].with_options(write_concern=WriteConcern(w=1))
+    result = await source.insert_many(documents, ordered=False)
     
     return [str(id) for id in result.inserted_ids]
 
-async def check_document_status(doc_id, expected_status):
+async def check_document_status(doc_id, expected_status, client=None):
     """
     Check if a document has the expected status.
     
     Args:
         doc_id: Document ID to check
         expected_status: Expected status value
+        client: AsyncIOMotorClient to use (defaults to the shared test client)
         
     Returns:
         True if status matches, False otherwise
     """
-    client = AsyncIOMotorClient(MONGODB_TEST_URI, **MONGODB_TEST_PARAMS)
+    if client is None:
+        client = await _get_client()
     db = client[MONGODB_TEST_DB]
     
     doc = await db[MONGODB_TEST_SOURCE_COLLECTION].find_one({"_id": ObjectId(doc_id)})
-    client.close()
     
     if doc and doc.get("status") == expected_status:
         return True
     return False
 
-async def count_documents(collection_name, query=None):
+async def count_documents(collection_name, query=None, client=None):
     """
     Count documents in a collection.
     
     Args:
         collection_name: Name of the collection ('source' or 'target')
         query: Query filter to apply
+        client: AsyncIOMotorClient to use (defaults to the shared test client)
         
     Returns:
         Document count
     """
-    client = AsyncIOMotorClient(MONGODB_TEST_URI, **MONGODB_TEST_PARAMS)
+    if client is None:
+        client = await _get_client()
     db = client[MONGODB_TEST_DB]
     
     if query is None:
@@ -140,5 +188,4 @@ async def count_documents(collection_name, query=None):
     else:
         count = 0
         
-    client.close()
     return count
\ No newline at end of file
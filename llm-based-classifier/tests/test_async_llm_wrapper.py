@@ -6,6 +6,7 @@ import os
 import json
 import pytest
 import asyncio
+import aiohttp
 from unittest.mock import patch, AsyncMock, MagicMock
 
 # Import the module to test
@@ -14,6 +15,22 @@ sys.path.append("..")
 import async_llm_wrapper
 
 
+@pytest.fixture(autouse=True)
+def reset_shared_session():
+    """Ensure each test builds its own (mocked) shared session."""
+    async_llm_wrapper._session = None
+    yield
+    async_llm_wrapper._session = None
+
+
+def post_returning(response):
+    """Build a session.post mock that yields response from `async with`."""
+    context = MagicMock()
+    context.__aenter__ = AsyncMock(return_value=response)
+    context.__aexit__ = AsyncMock(return_value=False)
+    return MagicMock(return_value=context)
+
+
 @pytest.mark.asyncio
 async def test_ollama_classify_async_success():
     """Test successful LLM interaction with proper JSON response."""
@@ -29,7 +46,7 @@ async def test_ollama_classify_async_success():
     
     # Create a mock session
     mock_session = AsyncMock()
-    mock_session.post = AsyncMock(return_value=mock_response)
+    mock_session.post = post_returning(mock_response)
     mock_session.closed = False
     
     with patch("aiohttp.ClientSession", return_value=mock_session):
@@ -55,7 +72,7 @@ async def test_ollama_classify_async_json_extraction():
     
     # Create a mock session
     mock_session = AsyncMock()
-    mock_session.post = AsyncMock(return_value=mock_response)
+    mock_session.post = post_returning(mock_response)
     mock_session.closed = False
     
     with patch("aiohttp.ClientSession", return_value=mock_session):
@@ -66,11 +83,33 @@ async def test_ollama_classify_async_json_extraction():
             assert result == {"intent": "Complaint", "topic": "Billing", "sentiment": "Negative"}
 
 
+@pytest.mark.asyncio
+async def test_ollama_classify_async_json_extraction_trailing_braces():
+    """Test that trailing text containing braces doesn't break extraction."""
+    response_data = {
+        "message": {"content": 'Result: {"intent": "Complaint", "topic": "Billing", "sentiment": "Negative"} (schema: {intent})'}
+    }
+    
+    mock_response = AsyncMock()
+    mock_response.status = 200
+    mock_response.json = AsyncMock(return_value=response_data)
+    
+    mock_session = AsyncMock()
+    mock_session.post = post_returning(mock_response)
+    mock_session.closed = False
+    
+    with patch("aiohttp.ClientSession", return_value=mock_session):
+        with patch.dict(os.environ, {"OLLAMA_MODEL": "llama3"}):
+            result = await async_llm_wrapper.ollama_classify_async([{"role": "user", "content": "test message"}])
+            
+            assert result == {"intent": "Complaint", "topic": "Billing", "sentiment": "Negative"}
+
+
 @pytest.mark.asyncio
 async def test_ollama_classify_async_request_error():
     """Test handling of HTTP request errors."""
     mock_session = AsyncMock()
-    mock_session.post.side_effect = Exception("Connection error")
+    mock_session.post = MagicMock(side_effect=Exception("Connection error"))
     mock_session.closed = False
     
     with patch("aiohttp.ClientSession", return_value=mock_session):
@@ -82,6 +121,25 @@ async def test_ollama_classify_async_request_error():
             assert "Connection error" in result["error"]
 
 
+@pytest.mark.asyncio
+async def test_ollama_classify_async_error_status_releases_response():
+    """Test that a non-200 response is released back to the pool."""
+    mock_response = AsyncMock()
+    mock_response.status = 500
+    
+    mock_session = AsyncMock()
+    mock_session.post = post_returning(mock_response)
+    mock_session.closed = False
+    
+    with patch("aiohttp.ClientSession", return_value=mock_session):
+        with patch.dict(os.environ, {"OLLAMA_MODEL": "llama3"}):
+            result = await async_llm_wrapper.ollama_classify_async([{"role": "user", "content": "test message"}])
+    
+    assert result == {"error": "LLM error status: 500"}
+    mock_session.post.return_value.__aexit__.assert_awaited_once()
+    mock_response.json.assert_not_awaited()
+
+
 @pytest.mark.asyncio
 async def test_ollama_classify_async_missing_model():
     """Test handling of missing OLLAMA_MODEL environment variable."""
@@ -102,8 +160,8 @@ async def test_safe_ollama_classify_async_with_retry():
     # Create a mock that fails twice then succeeds
     mock_ollama = AsyncMock()
     mock_ollama.side_effect = [
-        Exception("Temporary connection error"),
-        Exception("Still failing"),
+        aiohttp.ClientError("Temporary connection error"),
+        asyncio.TimeoutError(),
         success_response
     ]
     
@@ -119,6 +177,19 @@ async def test_safe_ollama_classify_async_with_retry():
             assert mock_ollama.call_count == 3
 
 
+@pytest.mark.asyncio
+async def test_safe_ollama_classify_async_no_retry_on_bug():
+    """Test that non-network exceptions are not retried."""
+    mock_ollama = AsyncMock()
+    mock_ollama.side_effect = KeyError("unexpected")
+    
+    with patch.object(async_llm_wrapper, "ollama_classify_async", mock_ollama):
+        with pytest.raises(KeyError):
+            await async_llm_wrapper.safe_ollama_classify_async([{"role": "user", "content": "test message"}])
+        
+        assert mock_ollama.call_count == 1
+
+
 @pytest.mark.asyncio
 async def test_ollama_classify_async_parsing_error():
     """Test handling of JSON parsing errors."""
@@ -134,7 +205,7 @@ async def test_ollama_classify_async_parsing_error():
     
     # Create a mock session
     mock_session = AsyncMock()
-    mock_session.post = AsyncMock(return_value=mock_response)
+    mock_session.post = post_returning(mock_response)
     mock_session.closed = False
     
     with patch("aiohttp.ClientSession", return_value=mock_session):
@@ -150,7 +221,7 @@ async def test_safe_ollama_classify_async_max_retries():
     """Test that the safe wrapper doesn't retry indefinitely."""
     # Create a mock that always fails
     mock_ollama = AsyncMock()
-    mock_ollama.side_effect = Exception("Persistent error")
+    mock_ollama.side_effect = aiohttp.ClientError("Persistent error")
     
     with patch.object(async_llm_wrapper, "ollama_classify_async", mock_ollama):
         with patch.object(async_llm_wrapper, "MAX_RETRIES", 3):
@@ -177,16 +248,16 @@ async def test_concurrent_ollama_calls():
     }
     
     # Track calls using a side effect
-    async def side_effect(*args, **kwargs):
+    def side_effect(*args, **kwargs):
         call_count.append(1)
         mock_response = AsyncMock()
         mock_response.status = 200
         mock_response.json = AsyncMock(return_value=response_data)
-        return mock_response
+        return post_returning(mock_response)()
     
     # Create a mock session
     mock_session = AsyncMock()
-    mock_session.post = AsyncMock(side_effect=side_effect)
+    mock_session.post = MagicMock(side_effect=side_effect)
     mock_session.closed = False
     
     with patch("aiohttp.ClientSession", return_value=mock_session):
@@ -203,4 +274,33 @@ async def test_concurrent_ollama_calls():
                 assert result == {"result": "ok"}
             
             # Verify we made 5 calls
-            assert len(call_count) == 5
\ No newline at end of file
+            assert len(call_count) == 5
+
+
+@pytest.mark.asyncio
+async def test_session_reused_across_calls():
+    """Test that consecutive calls share a single HTTP session."""
+    response_data = {
+        "message": {"content": '{"result": "ok"}'}
+    }
+    
+    mock_response = AsyncMock()
+    mock_response.status = 200
+    mock_response.json = AsyncMock(return_value=response_data)
+    
+    mock_session = AsyncMock()
+    mock_session.post = post_returning(mock_response)
+    mock_session.closed = False
+    
+    with patch("aiohttp.ClientSession", return_value=mock_session) as session_cls:
+        with patch.dict(os.environ, {"OLLAMA_MODEL": "llama3"}):
+            messages = [{"role": "user", "content": "test message"}]
+            await async_llm_wrapper.ollama_classify_async(messages)
+            await async_llm_wrapper.ollama_classify_async(messages)
+            
+            # Only one session should have been created for both calls
+            assert session_cls.call_count == 1
+            assert mock_session.post.call_count == 2
+            
+            await async_llm_wrapper.close_session()
+            mock_session.close.assert_awaited_once()
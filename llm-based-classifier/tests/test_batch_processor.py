@@ -7,8 +7,11 @@ import os
 import json
 from unittest.mock import AsyncMock, patch, MagicMock
 from datetime import datetime, timezone
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
 
-from batch_processor import BatchProcessor
+from batch_processor import BatchProcessor, CLASSIFICATION_PROJECTION
+from mongo_client import UNPROCESSED_FILTER
 
 
 @pytest.fixture
@@ -47,6 +50,31 @@ def batch_processor():
         print(f"Warning: Failed to clean up test directory: {e}")
 
 
+class FakeCursor:
+    """Minimal stand-in for a Motor cursor over a list of documents."""
+    def __init__(self, documents):
+        self.documents = documents
+        self.sort_spec = None
+    
+    def sort(self, key, direction):
+        self.sort_spec = (key, direction)
+        return self
+    
+    def batch_size(self, size):
+        return self
+    
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+    
+    def __aiter__(self):
+        return self._iterate()
+    
+    async def _iterate(self):
+        for doc in self.documents:
+            yield doc
+
+
 @pytest.fixture
 def mock_mongo_client():
     """Create a mock MongoDB client."""
@@ -87,51 +115,46 @@ class TestBatchProcessor:
             assert result is False
     
     @pytest.mark.asyncio
-    async def test_fetch_unprocessed_queries(self, batch_processor, mock_mongo_client):
-        """Test fetching unprocessed queries from MongoDB."""
-        # Setup the batch processor with mock client
-        batch_processor.mongo_client = mock_mongo_client
+    async def test_reconnect_closes_previous_client(self, batch_processor, mock_mongo_client):
+        """Test that connecting again releases the client it replaces."""
+        previous_client = AsyncMock()
+        batch_processor.mongo_client = previous_client
         
-        # Test the method
-        documents, more_available = await batch_processor.fetch_unprocessed_queries()
+        with patch('batch_processor.MongoClient', return_value=mock_mongo_client):
+            assert await batch_processor.connect() is True
         
-        # Check the result
-        assert len(documents) == 2
-        assert more_available is True
-        assert batch_processor.last_processed_id == "doc2"
-        mock_mongo_client.get_unprocessed_documents.assert_called_once_with(
-            batch_size=batch_processor.batch_size,
-            last_id=None
-        )
+        previous_client.close.assert_awaited_once()
+        assert batch_processor.mongo_client is mock_mongo_client
     
     @pytest.mark.asyncio
-    async def test_fetch_unprocessed_queries_with_last_id(self, batch_processor, mock_mongo_client):
-        """Test fetching unprocessed queries with a last_id."""
-        # Setup the batch processor with mock client
-        batch_processor.mongo_client = mock_mongo_client
-        batch_processor.last_processed_id = "last_doc"
+    async def test_shared_client_is_not_reconnected_or_closed(self, mock_mongo_client):
+        """Test that a caller-owned client is reused as-is."""
+        processor = BatchProcessor(mongo_client=mock_mongo_client, batch_dir="test_batch_files")
         
-        # Test the method
-        documents, more_available = await batch_processor.fetch_unprocessed_queries()
+        with patch('batch_processor.MongoClient') as mock_client_cls:
+            assert await processor.connect() is True
+            mock_client_cls.assert_not_called()
         
-        # Check the result
-        mock_mongo_client.get_unprocessed_documents.assert_called_once_with(
-            batch_size=batch_processor.batch_size,
-            last_id="last_doc"
-        )
+        await processor.close()
+        
+        assert processor.mongo_client is mock_mongo_client
+        mock_mongo_client.close.assert_not_called()
     
     @pytest.mark.asyncio
-    async def test_fetch_unprocessed_queries_error(self, batch_processor, mock_mongo_client):
-        """Test error handling when fetching unprocessed queries."""
-        # Setup the batch processor with mock client
+    async def test_stream_unprocessed_queries(self, batch_processor, mock_mongo_client):
+        """Test streaming unprocessed queries from a single cursor."""
         batch_processor.mongo_client = mock_mongo_client
-        mock_mongo_client.get_unprocessed_documents.side_effect = Exception("Database error")
+        documents = [{"_id": "doc1", "text": "a"}, {"_id": "doc2", "text": "b"}]
+        mock_mongo_client.source_collection = MagicMock()
+        mock_mongo_client.source_collection.find.return_value = FakeCursor(documents)
         
-        # Test the method
-        documents, more_available = await batch_processor.fetch_unprocessed_queries()
+        streamed = [doc async for doc in batch_processor.stream_unprocessed_queries()]
         
-        assert documents == []
-        assert more_available is False
+        assert streamed == documents
+        mock_mongo_client.source_collection.find.assert_called_once_with(
+            UNPROCESSED_FILTER,
+            CLASSIFICATION_PROJECTION
+        )
     
     @pytest.mark.asyncio
     async def test_prepare_message(self, batch_processor):
@@ -272,37 +295,12 @@ class TestBatchProcessor:
             })
     
     @pytest.mark.asyncio
-    async def test_process_batch(self, batch_processor):
-        """Test processing a batch of documents."""
-        # Create test documents
-        documents = [
-            {"_id": f"doc{i}", "query": f"Test query {i}"} for i in range(3)
-        ]
-        
-        # Mock _process_document to return success for all documents
-        mock_results = [
-            {"status": "success", "retried": False, "doc_id": f"doc{i}"} 
-            for i in range(3)
-        ]
-        
-        with patch.object(batch_processor, '_process_document', 
-                          AsyncMock(side_effect=mock_results)) as mock_process:
-            batch_stats = await batch_processor.process_batch(documents)
-            
-            assert mock_process.call_count == 3
-            assert batch_stats["total"] == 3
-            assert batch_stats["successful"] == 3
-            assert batch_stats["failed"] == 0
-            assert batch_stats["retried"] == 0
-            assert "duration_seconds" in batch_stats
-    
-    @pytest.mark.asyncio
-    async def test_process_batch_mixed_results(self, batch_processor):
-        """Test processing a batch with mixed success/failure."""
-        # Create test documents
-        documents = [
-            {"_id": f"doc{i}", "query": f"Test query {i}"} for i in range(4)
-        ]
+    async def test_process_stream_mixed_results(self, batch_processor, mock_mongo_client):
+        """Test that a streamed pass tallies success, failure and retries."""
+        documents = [{"_id": f"doc{i}", "query": f"Test query {i}"} for i in range(4)]
+        batch_processor.mongo_client = mock_mongo_client
+        mock_mongo_client.source_collection = MagicMock()
+        mock_mongo_client.source_collection.find.return_value = FakeCursor(documents)
         
         # Mock _process_document to return different results
         mock_results = [
@@ -312,15 +310,91 @@ class TestBatchProcessor:
             {"status": "success", "retried": False, "doc_id": "doc3"},
         ]
         
-        with patch.object(batch_processor, '_process_document', 
+        with patch.object(batch_processor, '_process_document',
                           AsyncMock(side_effect=mock_results)) as mock_process:
-            batch_stats = await batch_processor.process_batch(documents)
+            processed = await batch_processor._process_stream()
             
             assert mock_process.call_count == 4
-            assert batch_stats["total"] == 4
-            assert batch_stats["successful"] == 3
-            assert batch_stats["failed"] == 1
-            assert batch_stats["retried"] == 2
+            assert processed == 4
+            assert batch_processor.stats["documents_processed"] == 4
+            assert batch_processor.stats["successful"] == 3
+            assert batch_processor.stats["failed"] == 1
+            assert batch_processor.stats["retried"] == 2
+    
+    def test_advance_position_waits_for_earlier_documents(self, batch_processor):
+        """Test that the checkpoint position never passes a document still in flight."""
+        ids = [ObjectId() for _ in range(3)]
+        batch_processor._dispatched.extend(ids)
+        
+        # The second document finishes first; the first is still being classified
+        batch_processor._advance_position([{"doc_id": ids[1]}])
+        assert batch_processor.last_processed_id is None
+        
+        batch_processor._advance_position([{"doc_id": ids[0]}])
+        assert batch_processor.last_processed_id == ids[1]
+        
+        batch_processor._advance_position([{"doc_id": ids[2]}])
+        assert batch_processor.last_processed_id == ids[2]
+        assert not batch_processor._dispatched and not batch_processor._flushed_ids
+    
+    @pytest.mark.asyncio
+    async def test_flush_writes_holds_position_at_failed_update(self, batch_processor, mock_mongo_client):
+        """Test that the checkpoint position stops before a document whose status write failed."""
+        ids = [ObjectId() for _ in range(3)]
+        batch_processor.mongo_client = mock_mongo_client
+        mock_mongo_client.update_document_statuses = AsyncMock(
+            side_effect=BulkWriteError({"writeErrors": [{"index": 1, "errmsg": "boom"}]})
+        )
+        batch_processor._dispatched.extend(ids)
+        for doc_id in ids:
+            batch_processor._queue_mark_as_processed(doc_id)
+        
+        with patch.object(batch_processor.batch_file_manager, 'add_to_retry_queue') as mock_retry:
+            await batch_processor._flush_writes()
+        
+        mock_retry.assert_called_once()
+        assert batch_processor.last_processed_id == ids[0]
+        assert list(batch_processor._dispatched) == ids[1:]
+    
+    @pytest.mark.asyncio
+    async def test_producer_resumes_from_checkpoint_position(self, batch_processor, mock_mongo_client):
+        """Test that the producer starts after the restored position, in _id order."""
+        position = ObjectId()
+        batch_processor.mongo_client = mock_mongo_client
+        batch_processor.last_processed_id = str(position)  # as loaded from the checkpoint file
+        cursor = FakeCursor([])
+        mock_mongo_client.source_collection = MagicMock()
+        mock_mongo_client.source_collection.find.return_value = cursor
+        
+        await batch_processor._producer(asyncio.Queue())
+        
+        query_filter = mock_mongo_client.source_collection.find.call_args[0][0]
+        assert query_filter == {**UNPROCESSED_FILTER, "_id": {"$gt": position}}
+        assert cursor.sort_spec == ("_id", 1)
+    
+    @pytest.mark.asyncio
+    async def test_process_stream_checkpoints_flushed_position(self, batch_processor, mock_mongo_client):
+        """Test that checkpoints carry the flushed position and fire on a running count."""
+        ids = [ObjectId() for _ in range(7)]
+        documents = [{"_id": doc_id, "text": "hello"} for doc_id in ids]
+        batch_processor.mongo_client = mock_mongo_client
+        batch_processor.batch_size = 2
+        batch_processor.checkpoint_interval = 3
+        mock_mongo_client.source_collection = MagicMock()
+        mock_mongo_client.source_collection.find.return_value = FakeCursor(documents)
+        
+        async def process(document):
+            batch_processor._queue_mark_as_processed(document["_id"], {"status": "processed"})
+            return {"status": "success", "retried": False}
+        
+        with patch.object(batch_processor, '_process_document', side_effect=process):
+            with patch.object(batch_processor.batch_file_manager, 'save_checkpoint') as mock_save:
+                await batch_processor._process_stream()
+        
+        # Flushes of 2 never land on an exact multiple of 3, but the running count still triggers
+        assert mock_save.call_count >= 1
+        assert all(call_args[0][0] in ids for call_args in mock_save.call_args_list)
+        assert batch_processor.last_processed_id == ids[-1]
     
     @pytest.mark.asyncio
     async def test_checkpoint_operations(self, batch_processor):
@@ -412,36 +486,29 @@ class TestBatchProcessor:
             "processing_rate": 0
         }
         
-        # Setup the batch processor with mock client
+        # Stream two documents through the worker pool
+        documents = [{"_id": "doc1", "query": "test"}, {"_id": "doc2", "query": "test2"}]
+        mock_mongo_client.source_collection = MagicMock()
+        mock_mongo_client.source_collection.find.return_value = FakeCursor(documents)
+        
         with patch('batch_processor.MongoClient', return_value=mock_mongo_client):
-            # Mock the fetch_unprocessed_queries method
-            with patch.object(batch_processor, 'fetch_unprocessed_queries', 
-                              side_effect=[
-                                  ([{"_id": "doc1", "query": "test"}], True),
-                                  ([{"_id": "doc2", "query": "test2"}], False)
-                              ]) as mock_fetch:
-                
-                # Create a real process_batch method to update stats correctly
-                original_process_batch = batch_processor.process_batch
-                
-                async def mock_process_batch_with_stats(documents):
-                    # Return the mock results but also update stats like the real method would
-                    batch_processor.stats["batches_processed"] += 1
-                    return {"total": 1, "successful": 1, "failed": 0, "retried": 0}
-                
-                with patch.object(batch_processor, 'process_batch',
-                                  side_effect=mock_process_batch_with_stats) as mock_process:
-                    with patch.object(batch_processor, 'save_checkpoint',
-                                      AsyncMock()) as mock_save:
-                        
-                        # Run the processor in batch mode
-                        stats = await batch_processor.run()
-                        
-                        # Check results
-                        assert mock_fetch.call_count == 2
-                        assert mock_process.call_count == 2
-                        assert stats["batches_processed"] == 2
-                        assert mock_save.call_count >= 1  # At least once for final checkpoint
+            with patch.object(batch_processor, '_process_document',
+                              AsyncMock(return_value={"status": "success", "retried": False})) as mock_process:
+                with patch.object(batch_processor, 'save_checkpoint',
+                                  AsyncMock()) as mock_save:
+                    
+                    # Run the processor in batch mode
+                    stats = await batch_processor.run()
+                    
+                    # Check results
+                    mock_mongo_client.source_collection.find.assert_called_once_with(
+                        UNPROCESSED_FILTER,
+                        CLASSIFICATION_PROJECTION
+                    )
+                    assert mock_process.call_count == 2
+                    assert stats["documents_processed"] == 2
+                    assert stats["successful"] == 2
+                    assert mock_save.call_count >= 1  # At least once for final checkpoint
     
     @pytest.mark.asyncio
     async def test_run_continuous_mode(self, batch_processor, mock_mongo_client):
@@ -456,8 +523,8 @@ class TestBatchProcessor:
             raise asyncio.CancelledError()
             
         with patch('batch_processor.MongoClient', return_value=mock_mongo_client):
-            with patch.object(batch_processor, 'fetch_unprocessed_queries',
-                              return_value=([], False)) as mock_fetch:
+            with patch.object(batch_processor, '_process_stream',
+                              AsyncMock(return_value=0)) as mock_stream:
                 with patch.object(batch_processor, 'process_retry_queue',
                                   AsyncMock()) as mock_retry:
                     with patch('asyncio.sleep', mock_sleep):
@@ -469,9 +536,37 @@ class TestBatchProcessor:
                             pass
                             
                         # Verify behavior
-                        assert mock_fetch.call_count >= 1
+                        assert mock_stream.call_count >= 1
                         mock_retry.assert_not_called()  # No retry since we did no batches
                         
+    @pytest.mark.asyncio
+    async def test_run_continuous_mode_rescans_from_start(self, batch_processor, mock_mongo_client):
+        """Test that passes after the first start from the beginning, not the checkpoint."""
+        batch_processor.last_processed_id = "checkpointed_id"
+        positions = []
+        
+        async def process_stream():
+            positions.append(batch_processor.last_processed_id)
+            batch_processor.last_processed_id = f"end_of_pass_{len(positions)}"
+            return 1
+        
+        sleeps = 0
+        
+        async def mock_sleep(seconds):
+            nonlocal sleeps
+            sleeps += 1
+            if sleeps == 2:
+                raise asyncio.CancelledError()
+        
+        with patch('batch_processor.MongoClient', return_value=mock_mongo_client):
+            with patch.object(batch_processor, '_process_stream', side_effect=process_stream):
+                with patch.object(batch_processor, 'process_retry_queue', AsyncMock()):
+                    with patch.object(batch_processor, 'save_checkpoint', AsyncMock()):
+                        with patch('asyncio.sleep', mock_sleep):
+                            await batch_processor.run(continuous=True)
+        
+        assert positions == ["checkpointed_id", None]
+    
     @pytest.mark.asyncio
     async def test_run_recover_mode(self, batch_processor, mock_mongo_client):
         """Test running with recovery from checkpoint."""
@@ -481,8 +576,8 @@ class TestBatchProcessor:
                               AsyncMock(return_value=True)) as mock_load:
                 with patch.object(batch_processor, 'process_retry_queue',
                                   AsyncMock()) as mock_retry:
-                    with patch.object(batch_processor, 'fetch_unprocessed_queries',
-                                      return_value=([], False)) as mock_fetch:
+                    with patch.object(batch_processor, '_process_stream',
+                                      AsyncMock(return_value=0)) as mock_stream:
                         
                         # Run with recovery
                         await batch_processor.run(recover=True)
@@ -490,4 +585,4 @@ class TestBatchProcessor:
                         # Verify behavior
                         mock_load.assert_called_once()
                         mock_retry.assert_called_once()
-                        mock_fetch.assert_called_once()
\ No newline at end of file
+                        mock_stream.assert_called_once()
\ No newline at end of file
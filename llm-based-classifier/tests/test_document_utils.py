@@ -0,0 +1,31 @@
+"""
+Unit tests for the document normalization helpers.
+"""
+from utils.document_utils import normalize_document
+
+
+def test_tweets_take_priority():
+    doc = {
+        "tweets": [{"text": "My order is late"}, {"text": "Any update?"}],
+        "messages": [{"sender": "agent", "content": "ignored"}],
+    }
+    assert normalize_document(doc) == "Customer: My order is late\nCustomer: Any update?"
+
+
+def test_messages_fallback():
+    doc = {
+        "messages": [
+            {"sender": "customer", "content": "Where is my refund?"},
+            {"sender": "agent", "text": "Checking now."},
+        ]
+    }
+    assert normalize_document(doc) == "Customer: Where is my refund?\nAgent: Checking now."
+
+
+def test_text_and_content_fallback():
+    assert normalize_document({"text": "plain text"}) == "plain text"
+    assert normalize_document({"content": "plain content"}) == "plain content"
+
+
+def test_empty_document():
+    assert normalize_document({"_id": "doc1"}) == ""
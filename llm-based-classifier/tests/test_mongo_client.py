@@ -7,11 +7,12 @@ import pytest
 import asyncio
 import json
 import os
-from unittest.mock import AsyncMock, patch, MagicMock
+from unittest.mock import AsyncMock, patch, MagicMock, call
 from datetime import datetime, timezone
 from bson.objectid import ObjectId
+from pymongo import ReturnDocument, UpdateOne
 
-from mongo_client import MongoClient
+from mongo_client import MongoClient, UNPROCESSED_FILTER, SOURCE_DOCUMENT_PROJECTION
 
 @pytest.fixture
 def mongo_client(mock_motor_client):
@@ -81,7 +82,7 @@ class TestMongoClient:
     @pytest.mark.asyncio
     async def test_connect(self, mongo_client, mock_motor_client):
         """Test connecting to MongoDB."""
-        await mongo_client.connect()
+        await mongo_client.connect(verify=True)
         
         # Check that server_info was called
         mock_motor_client.server_info.assert_called_once()
@@ -99,16 +100,57 @@ class TestMongoClient:
         mock_motor_client.server_info = AsyncMock(side_effect=Exception("Connection failed"))
         
         with pytest.raises(Exception):
-            await mongo_client.connect()
+            await mongo_client.connect(verify=True)
+    
+    @pytest.mark.asyncio
+    async def test_connect_skips_server_round_trip_by_default(self, mongo_client, mock_motor_client):
+        """Test that connect() leaves reachability to the first real operation unless asked to verify."""
+        await mongo_client.connect()
+        
+        mock_motor_client.server_info.assert_not_called()
+        assert mongo_client.source_collection is not None
+        await mongo_client.close()
+        assert mongo_client._index_task is None
+    
+    @pytest.mark.asyncio
+    async def test_async_context_manager_closes_client(self, mongo_client, mock_motor_client):
+        """Test that async with connects on entry and closes on exit, even after an error."""
+        with patch('mongo_client.AsyncIOMotorClient', return_value=mock_motor_client):
+            with pytest.raises(RuntimeError):
+                async with mongo_client as client:
+                    assert client is mongo_client
+                    assert client.client is mock_motor_client
+                    raise RuntimeError("boom")
+        
+        mock_motor_client.close.assert_called_once()
+        assert mongo_client.client is None
     
     @pytest.mark.asyncio
     async def test_create_indexes(self, mongo_client, mock_motor_client):
         """Test creating indexes on collections."""
         await mongo_client.connect()
+        # Indexes are built in the background; wait for them before checking
+        await mongo_client._index_task
         
         # Check that create_index was called on both collections
         mongo_client.source_collection.create_index.assert_called()
         mongo_client.target_collection.create_index.assert_called()
+        
+        # Indexes backing the processed_at / last_processed_at sorts
+        mongo_client.source_collection.create_index.assert_any_call([("status", 1), ("last_processed_at", -1)])
+        mongo_client.target_collection.create_index.assert_any_call([("processed_at", -1)])
+        
+        # The unprocessed-document pagination is served by {status, _id}; no standalone status index
+        mongo_client.source_collection.create_index.assert_any_call([("status", 1), ("_id", 1)])
+        assert call("status") not in mongo_client.source_collection.create_index.call_args_list
+        
+        # Idempotency index; its source_object_id prefix replaces the standalone index
+        mongo_client.target_collection.create_index.assert_any_call(
+            [("source_object_id", 1), ("processing_metadata.batch_job_id", 1)],
+            unique=True,
+            partialFilterExpression={"source_object_id": {"$exists": True}}
+        )
+        assert call("source_object_id") not in mongo_client.target_collection.create_index.call_args_list
     
     @pytest.mark.asyncio
     async def test_fetch_unprocessed_documents(self, mongo_client, mock_motor_client):
@@ -136,11 +178,19 @@ class TestMongoClient:
                     self.index += 1
                     return result
                 raise StopAsyncIteration
+                
+            def batch_size(self, size):
+                self.requested_batch_size = size
+                return self
+                
+            async def to_list(self, length=None):
+                return self.data[:length]
         
         # Setup the find operation
         mock_cursor = AsyncIterMock(mock_docs)
         limit_mock = MagicMock(return_value=mock_cursor)
-        find_mock = MagicMock(return_value=MagicMock(limit=limit_mock))
+        sort_mock = MagicMock(return_value=MagicMock(limit=limit_mock))
+        find_mock = MagicMock(return_value=MagicMock(sort=sort_mock))
         
         await mongo_client.connect()
         
@@ -151,8 +201,10 @@ class TestMongoClient:
         documents, first_id, last_id = await mongo_client.fetch_unprocessed_documents(batch_size=10)
         
         # Verify find was called with correct parameters
-        mongo_client.source_collection.find.assert_called_once_with({"status": {"$ne": "processed"}})
+        mongo_client.source_collection.find.assert_called_once_with(UNPROCESSED_FILTER, SOURCE_DOCUMENT_PROJECTION)
+        sort_mock.assert_called_once_with("_id", 1)
         limit_mock.assert_called_once_with(10)
+        assert mock_cursor.requested_batch_size == 10
         
         # Check the results
         assert len(documents) == 2
@@ -183,11 +235,19 @@ class TestMongoClient:
                     self.index += 1
                     return result
                 raise StopAsyncIteration
+                
+            def batch_size(self, size):
+                self.requested_batch_size = size
+                return self
+                
+            async def to_list(self, length=None):
+                return self.data[:length]
         
         # Setup the find operation
         mock_cursor = AsyncIterMock(mock_doc)
         limit_mock = MagicMock(return_value=mock_cursor)
-        find_mock = MagicMock(return_value=MagicMock(limit=limit_mock))
+        sort_mock = MagicMock(return_value=MagicMock(limit=limit_mock))
+        find_mock = MagicMock(return_value=MagicMock(sort=sort_mock))
         
         await mongo_client.connect()
         
@@ -203,7 +263,9 @@ class TestMongoClient:
         find_call_args = mongo_client.source_collection.find.call_args[0][0]
         assert "_id" in find_call_args
         assert str(find_call_args["_id"]["$gt"]) == str(ObjectId(last_object_id))
+        sort_mock.assert_called_once_with("_id", 1)
         limit_mock.assert_called_once_with(10)
+        assert mock_cursor.requested_batch_size == 10
         
         # Check the results
         assert len(documents) == 1
@@ -211,6 +273,48 @@ class TestMongoClient:
         assert first_id == str(doc_id)
         assert last_id == str(doc_id)
     
+    @pytest.mark.asyncio
+    async def test_fetch_unprocessed_documents_with_object_id(self, mongo_client, mock_motor_client):
+        """Test that an ObjectId last_object_id is used as-is."""
+        cursor = MagicMock()
+        cursor.to_list = AsyncMock(return_value=[])
+        find_mock = MagicMock()
+        find_mock.return_value.sort.return_value.limit.return_value.batch_size.return_value = cursor
+        
+        await mongo_client.connect()
+        mongo_client.source_collection.find = find_mock
+        
+        last_object_id = ObjectId("507f1f77bcf86cd799439011")
+        documents, first_id, last_id = await mongo_client.fetch_unprocessed_documents(
+            batch_size=10, last_object_id=last_object_id
+        )
+        
+        assert find_mock.call_args[0][0]["_id"]["$gt"] is last_object_id
+        assert documents == [] and first_id is None and last_id is None
+    
+    @pytest.mark.asyncio
+    async def test_fetch_unprocessed_documents_with_filter_criteria(self, mongo_client, mock_motor_client):
+        """Test that filter_criteria is merged into the server-side query."""
+        cursor = MagicMock()
+        cursor.to_list = AsyncMock(return_value=[])
+        find_mock = MagicMock()
+        find_mock.return_value.sort.return_value.limit.return_value.batch_size.return_value = cursor
+        
+        await mongo_client.connect()
+        mongo_client.source_collection.find = find_mock
+        
+        await mongo_client.fetch_unprocessed_documents(
+            batch_size=10,
+            last_object_id="507f1f77bcf86cd799439011",
+            filter_criteria={"test_run_id": "run-1"}
+        )
+        
+        query_filter = find_mock.call_args[0][0]
+        assert query_filter["test_run_id"] == "run-1"
+        assert query_filter["status"] == UNPROCESSED_FILTER["status"]
+        assert query_filter["_id"] == {"$gt": ObjectId("507f1f77bcf86cd799439011")}
+        assert "test_run_id" not in UNPROCESSED_FILTER
+    
     @pytest.mark.asyncio
     async def test_update_document_status(self, mongo_client, mock_motor_client):
         """Test updating document status."""
@@ -246,7 +350,72 @@ class TestMongoClient:
         assert call_args[1]["$set"]["status"] == "processed"
         assert call_args[1]["$set"]["result_id"] == result_id
         assert "last_processed_at" in call_args[1]["$set"]
-    
+
+    @pytest.mark.asyncio
+    async def test_update_document_status_returns_post_image(self, mongo_client, mock_motor_client):
+        """Test that return_document fetches the updated document in the same call."""
+        with patch('mongo_client.AsyncIOMotorClient', return_value=mock_motor_client):
+            await mongo_client.connect()
+        
+        doc_id = "507f1f77bcf86cd799439011"
+        updated = {"_id": ObjectId(doc_id), "status": "processed", "result_id": "r1"}
+        mongo_client.source_collection.update_one = AsyncMock()
+        mongo_client.source_collection.find_one_and_update = AsyncMock(return_value=updated)
+        
+        doc = await mongo_client.update_document_status(doc_id, "processed", "r1", return_document=True)
+        
+        assert doc == updated
+        mongo_client.source_collection.update_one.assert_not_called()
+        mongo_client.source_collection.find_one_and_update.assert_awaited_once()
+        call_args, call_kwargs = mongo_client.source_collection.find_one_and_update.call_args
+        assert call_args[0] == {"_id": ObjectId(doc_id)}
+        assert call_args[1]["$set"]["status"] == "processed"
+        assert call_args[1]["$set"]["result_id"] == "r1"
+        assert call_kwargs["projection"] == {"status": 1, "result_id": 1}
+        assert call_kwargs["return_document"] is ReturnDocument.AFTER
+
+    @pytest.mark.asyncio
+    async def test_update_document_statuses(self, mongo_client, mock_motor_client):
+        """Test updating many document statuses in one bulk write."""
+        with patch('mongo_client.AsyncIOMotorClient', return_value=mock_motor_client):
+            await mongo_client.connect()
+        mongo_client.source_collection.bulk_write = AsyncMock()
+
+        now = datetime.now(timezone.utc)
+        updates = [
+            {"doc_id": "507f1f77bcf86cd799439011", "status": "processed", "result_id": "507f1f77bcf86cd799439022"},
+            {"doc_id": "507f1f77bcf86cd799439012", "status": "failed"}
+        ]
+        await mongo_client.update_document_statuses(updates, now=now)
+
+        # One unordered bulk_write carrying one UpdateOne per document
+        mongo_client.source_collection.bulk_write.assert_awaited_once()
+        operations = mongo_client.source_collection.bulk_write.call_args[0][0]
+        assert mongo_client.source_collection.bulk_write.call_args[1]["ordered"] is False
+        assert operations == [
+            UpdateOne(
+                {"_id": ObjectId(updates[0]["doc_id"])},
+                {"$set": {"status": "processed", "last_processed_at": now, "result_id": updates[0]["result_id"]},
+                 "$inc": {"processing_attempts": 1}}
+            ),
+            UpdateOne(
+                {"_id": ObjectId(updates[1]["doc_id"])},
+                {"$set": {"status": "failed", "last_processed_at": now},
+                 "$inc": {"processing_attempts": 1}}
+            )
+        ]
+
+    @pytest.mark.asyncio
+    async def test_update_document_statuses_empty(self, mongo_client, mock_motor_client):
+        """Test that an empty update list skips the bulk write."""
+        with patch('mongo_client.AsyncIOMotorClient', return_value=mock_motor_client):
+            await mongo_client.connect()
+        mongo_client.source_collection.bulk_write = AsyncMock()
+
+        await mongo_client.update_document_statuses([])
+
+        mongo_client.source_collection.bulk_write.assert_not_called()
+
     @pytest.mark.asyncio
     async def test_store_classification_result(self, mongo_client, mock_motor_client):
         """Test storing classification result."""
@@ -293,6 +462,34 @@ class TestMongoClient:
         # Check the returned ID
         assert returned_id == str(result_id)
             
+    def test_build_result_document_uses_shared_timestamp(self, mongo_client):
+        """Test that a caller-supplied timestamp is used for processed_at."""
+        now = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        document = {"_id": ObjectId("507f1f77bcf86cd799439022"), "conversation_number": "C1", "processing_attempts": 1}
+        
+        result_doc = mongo_client.build_result_document(document, {"intent": "question"}, "batch_123", now=now)
+        
+        assert result_doc["processed_at"] is now
+        assert result_doc["processing_metadata"]["processing_attempts"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_store_classification_results(self, mongo_client, mock_motor_client):
+        """Test storing many classification results with one insert_many."""
+        inserted_ids = [ObjectId("507f1f77bcf86cd799439011"), ObjectId("507f1f77bcf86cd799439012")]
+        
+        with patch('mongo_client.AsyncIOMotorClient', return_value=mock_motor_client):
+            await mongo_client.connect()
+        mongo_client.target_collection.insert_many = AsyncMock(return_value=MagicMock(inserted_ids=inserted_ids))
+        
+        result_docs = [
+            mongo_client.build_result_document({"_id": ObjectId(), "conversation_number": "C1"}, {"intent": "question"}, "batch_123"),
+            mongo_client.build_result_document({"_id": ObjectId(), "conversation_number": "C2"}, {"intent": "complaint"}, "batch_123")
+        ]
+        returned_ids = await mongo_client.store_classification_results(result_docs)
+        
+        mongo_client.target_collection.insert_many.assert_awaited_once_with(result_docs, ordered=False)
+        assert returned_ids == ["507f1f77bcf86cd799439011", "507f1f77bcf86cd799439012"]
+            
     @pytest.mark.asyncio
     async def test_store_classification_result_no_conversation_number(self, mongo_client, mock_motor_client):
         """Test storing classification result when conversation_number is missing."""
@@ -44,7 +44,7 @@ with patch('motor.motor_asyncio.AsyncIOMotorClient') as mock_motor_client_class:
     mock_motor_client_class.return_value = mock_instance
     
     # Import the class under test after patching
-    from mongo_client import MongoClient
+    from mongo_client import MongoClient, UNPROCESSED_FILTER, SOURCE_DOCUMENT_PROJECTION
     from utils.retry_utils import RetryError
 
 @pytest.fixture
@@ -78,7 +78,7 @@ class TestMongoClient:
     @pytest.mark.asyncio
     async def test_connect(self, mongo_client):
         """Test connecting to MongoDB."""
-        await mongo_client.connect()
+        await mongo_client.connect(verify=True)
         
         # Check that server_info was called
         mock_instance.server_info.assert_called_once()
@@ -93,6 +93,8 @@ class TestMongoClient:
     async def test_create_indexes(self, mongo_client):
         """Test creating indexes on collections."""
         await mongo_client.connect()
+        # Indexes are built in the background; wait for them before checking
+        await mongo_client._index_task
         
         # Check that create_index was called on both collections
         mock_source_collection.create_index.assert_called()
@@ -124,11 +126,19 @@ class TestMongoClient:
                     self.index += 1
                     return result
                 raise StopAsyncIteration
+                
+            def batch_size(self, size):
+                self.requested_batch_size = size
+                return self
+                
+            async def to_list(self, length=None):
+                return self.data[:length]
         
         # Setup the find operation
         mock_cursor = AsyncIterMock(mock_docs)
         limit_mock = MagicMock(return_value=mock_cursor)
-        find_mock = MagicMock(return_value=MagicMock(limit=limit_mock))
+        sort_mock = MagicMock(return_value=MagicMock(limit=limit_mock))
+        find_mock = MagicMock(return_value=MagicMock(sort=sort_mock))
         
         await mongo_client.connect()
         
@@ -139,8 +149,10 @@ class TestMongoClient:
         documents, first_id, last_id = await mongo_client.fetch_unprocessed_documents(batch_size=10)
         
         # Verify find was called with correct parameters
-        mongo_client.source_collection.find.assert_called_once_with({"status": {"$ne": "processed"}})
+        mongo_client.source_collection.find.assert_called_once_with(UNPROCESSED_FILTER, SOURCE_DOCUMENT_PROJECTION)
+        sort_mock.assert_called_once_with("_id", 1)
         limit_mock.assert_called_once_with(10)
+        assert mock_cursor.requested_batch_size == 10
         
         # Check the results
         assert len(documents) == 2
@@ -171,11 +183,19 @@ class TestMongoClient:
                     self.index += 1
                     return result
                 raise StopAsyncIteration
+                
+            def batch_size(self, size):
+                self.requested_batch_size = size
+                return self
+                
+            async def to_list(self, length=None):
+                return self.data[:length]
         
         # Setup the find operation
         mock_cursor = AsyncIterMock(mock_doc)
         limit_mock = MagicMock(return_value=mock_cursor)
-        find_mock = MagicMock(return_value=MagicMock(limit=limit_mock))
+        sort_mock = MagicMock(return_value=MagicMock(limit=limit_mock))
+        find_mock = MagicMock(return_value=MagicMock(sort=sort_mock))
         
         await mongo_client.connect()
         
@@ -191,7 +211,9 @@ class TestMongoClient:
         find_call_args = mongo_client.source_collection.find.call_args[0][0]
         assert "_id" in find_call_args
         assert str(find_call_args["_id"]["$gt"]) == str(ObjectId(last_object_id))
+        sort_mock.assert_called_once_with("_id", 1)
         limit_mock.assert_called_once_with(10)
+        assert mock_cursor.requested_batch_size == 10
         
         # Check the results
         assert len(documents) == 1
@@ -0,0 +1,71 @@
+"""
+Unit tests for the shared diagnostic MongoDB client.
+"""
+import orjson
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from bson import Binary, Decimal128, ObjectId
+
+import utils.mongo_utils as mongo_utils
+
+
+def test_get_client_is_cached():
+    with patch("utils.mongo_utils.AsyncIOMotorClient") as mock_client_cls:
+        try:
+            first = mongo_utils.get_client()
+            second = mongo_utils.get_client()
+
+            assert first is second
+            mock_client_cls.assert_called_once()
+            kwargs = mock_client_cls.call_args.kwargs
+            assert kwargs["minPoolSize"] > 0
+            assert kwargs["maxPoolSize"] >= kwargs["minPoolSize"]
+        finally:
+            mongo_utils.close_client()
+
+
+def test_close_client_resets():
+    client = MagicMock()
+    with patch("utils.mongo_utils.AsyncIOMotorClient", return_value=client):
+        mongo_utils.get_client()
+        mongo_utils.close_client()
+
+    client.close.assert_called_once()
+    assert mongo_utils._client is None
+
+
+@pytest.mark.asyncio
+async def test_list_user_database_names():
+    client = MagicMock()
+    client.admin.command = AsyncMock(return_value={"databases": [{"name": "customer_support"}]})
+
+    names = await mongo_utils.list_user_database_names(client)
+
+    assert names == ["customer_support"]
+    command = client.admin.command.call_args.args[0]
+    assert command["nameOnly"] is True
+    assert command["filter"] == {"name": {"$nin": ["admin", "local", "config"]}}
+
+
+def test_bson_default_serializes_object_id():
+    oid = ObjectId()
+    doc = {"_id": oid, "processed_at": datetime(2024, 1, 2, tzinfo=timezone.utc)}
+
+    encoded = orjson.loads(orjson.dumps(doc, default=mongo_utils.bson_default))
+
+    assert encoded == {"_id": str(oid), "processed_at": "2024-01-02T00:00:00+00:00"}
+
+
+def test_bson_default_serializes_decimal_and_binary():
+    doc = {"amount": Decimal128("1.50"), "blob": Binary(b"\x01\xff")}
+
+    encoded = orjson.loads(orjson.dumps(doc, default=mongo_utils.bson_default))
+
+    assert encoded == {"amount": "1.50", "blob": "01ff"}
+
+
+def test_bson_default_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        orjson.dumps({"value": object()}, default=mongo_utils.bson_default)
@@ -3,8 +3,11 @@ test_prompt_builder.py
 Tests for the prompt builder.
 """
 
+import re
 import pytest
-from prompt_builder import build_prompt
+from prompt_builder import (
+    build_prompt, SYSTEM_PROMPT, FEW_SHOTS, INTENT_OPTIONS, TOPIC_OPTIONS, SENTIMENT_OPTIONS
+)
 
 def test_valid_prompt():
     conversation_number = "789"
@@ -25,3 +28,22 @@ def test_error_handling():
     # Simulate error by passing None (should not raise exception)
     result = build_prompt(None, None)
     assert "error" in result
+
+def test_prompts_share_prefix_without_aliasing():
+    first = build_prompt("1", "Customer: Where is my order?")
+    second = build_prompt("2", "Customer: I want a refund.")
+    assert first["messages"][:-1] == second["messages"][:-1]
+    assert first["messages"][-1] != second["messages"][-1]
+    # Appending to one prompt's message list must not leak into later prompts
+    first["messages"].append({"role": "user", "content": "extra"})
+    assert len(build_prompt("3", "Customer: Hi")["messages"]) == len(second["messages"])
+
+def test_prompt_values_are_allowed_options():
+    # The prompt advertises a curated subset; every value it names must validate
+    intents, topics = re.findall(r'Allowed intents: (.*?)\n\nAllowed topics: (.*)', SYSTEM_PROMPT, re.S)[0]
+    assert set(re.findall(r'"([^"]+)"', intents)) <= INTENT_OPTIONS
+    assert set(re.findall(r'"([^"]+)"', topics)) <= TOPIC_OPTIONS
+    for example in FEW_SHOTS:
+        assert example["output"]["intent"] in INTENT_OPTIONS
+        assert example["output"]["topic"] in TOPIC_OPTIONS
+        assert example["output"]["sentiment"] in SENTIMENT_OPTIONS
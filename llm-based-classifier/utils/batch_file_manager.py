@@ -5,6 +5,7 @@ Provides functionality for creating and managing batch files, retry queues, and
 
 import os
 import json
+import orjson
 import asyncio
 import time
 from datetime import datetime, timezone
@@ -282,8 +283,11 @@ class BatchFileManager:
             "stats": progress_stats
         }
         
-        with open(self.checkpoint_file, 'w') as f:
-            json.dump(checkpoint_data, f, indent=2, default=str)
+        # Write to a temp file and rename so a crash never leaves a partial checkpoint
+        tmp_file = f"{self.checkpoint_file}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(orjson.dumps(checkpoint_data, default=str, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_file, self.checkpoint_file)
         
         logger.info(f"Saved checkpoint: last_processed_object_id={last_processed_object_id}")
     
@@ -299,12 +303,12 @@ class BatchFileManager:
             return {}
         
         try:
-            with open(self.checkpoint_file, 'r') as f:
-                checkpoint_data = json.load(f)
+            with open(self.checkpoint_file, 'rb') as f:
+                checkpoint_data = orjson.loads(f.read())
             
             logger.info(f"Loaded checkpoint: last_processed_object_id={checkpoint_data.get('last_processed_object_id')}")
             return checkpoint_data
-        except (json.JSONDecodeError, FileNotFoundError) as e:
+        except (orjson.JSONDecodeError, FileNotFoundError) as e:
             logger.warning(f"Failed to load checkpoint: {e}")
             return {}
             
@@ -0,0 +1,42 @@
+"""
+Document normalization helpers for batch processing.
+Flattens source documents into the conversation text sent to the LLM.
+
+The module is fully annotated and free of dynamic tricks so it can be
+compiled ahead of time with mypyc (`mypyc utils/document_utils.py`); the
+compiled extension shadows this file automatically when present.
+"""
+
+from typing import Any, Dict, List
+
+
+def normalize_document(document: Dict[str, Any]) -> str:
+    """
+    Build the conversation text for a source document.
+
+    Tweets are used first, then messages, then a top-level text/content field.
+
+    Args:
+        document: Source document from MongoDB
+
+    Returns:
+        The conversation text, or an empty string if the document has none
+    """
+    parts: List[str] = [
+        f"Customer: {tweet['text']}"
+        for tweet in document.get("tweets") or []
+        if isinstance(tweet, dict) and "text" in tweet
+    ]
+    if not parts:
+        parts = [
+            f"{message.get('sender', 'Customer').capitalize()}: {message.get('content') or message.get('text', '')}"
+            for message in document.get("messages") or []
+            if isinstance(message, dict)
+        ]
+    conversation_text = "\n".join(parts)
+    if not conversation_text.strip():
+        if "text" in document:
+            conversation_text = document["text"]
+        elif "content" in document:
+            conversation_text = document["content"]
+    return conversation_text
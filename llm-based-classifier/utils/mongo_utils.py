@@ -0,0 +1,87 @@
+"""
+Shared MongoDB client for the diagnostic scripts.
+Builds one pooled AsyncIOMotorClient per process and closes it at exit.
+"""
+
+import atexit
+from typing import Any, List, Optional
+
+from bson import Binary, Decimal128, ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from config.settings import SETTINGS
+
+_client: Optional[AsyncIOMotorClient] = None
+
+SYSTEM_DATABASES = ["admin", "local", "config"]
+
+
+def get_client() -> AsyncIOMotorClient:
+    """
+    Return the shared client, creating it on first use.
+
+    Returns:
+        AsyncIOMotorClient connected to MONGODB_URI
+    """
+    global _client
+    if _client is None:
+        _client = AsyncIOMotorClient(
+            SETTINGS.mongodb_uri,
+            maxPoolSize=50,
+            minPoolSize=5,
+            serverSelectionTimeoutMS=5000
+        )
+    return _client
+
+
+def close_client() -> None:
+    """Close the shared client, if one was created."""
+    global _client
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+async def list_user_database_names(client: AsyncIOMotorClient) -> List[str]:
+    """
+    List database names, skipping the system databases.
+
+    Runs listDatabases with nameOnly so the server skips per-database size
+    calculation, and filters the system databases server-side.
+
+    Args:
+        client: Connected Motor client
+
+    Returns:
+        Names of the non-system databases
+    """
+    result = await client.admin.command({
+        "listDatabases": 1,
+        "nameOnly": True,
+        "filter": {"name": {"$nin": SYSTEM_DATABASES}}
+    })
+    return [db["name"] for db in result["databases"]]
+
+
+# Exact-type lookup for BSON values orjson can't encode natively
+_BSON_DEFAULTS = {
+    ObjectId: str,
+    Decimal128: str,
+    Binary: bytes.hex,
+}
+
+
+def bson_default(obj: Any) -> Any:
+    """
+    orjson default hook for BSON values it can't encode natively.
+
+    datetimes are handled by orjson itself. ObjectId and Decimal128 are
+    written as strings and Binary as hex.
+    """
+    convert = _BSON_DEFAULTS.get(type(obj))
+    if convert is None:
+        raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+    return convert(obj)
+
+
+atexit.register(close_client)